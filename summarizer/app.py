@@ -1,9 +1,20 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import json
 import os
 from pydantic import BaseModel
 import subprocess
+from jobs.manager import JobManager
+from jobs.warmup import Warmup
+from llm.client import chat_client
 from llm.embedding import VectorStore
 from llm.hybrid_llm import HybridLlm
+from llm.response_cache import ResponseCache
+from llm.router import QueryRouter
+from llm.session_store import MemorySessionBackend, RedisSessionBackend, SessionStore
+from llm.tracing import render_metrics, span, start_trace
 
 
 QUERY_MODEL = "llama-3.3-70b-versatile"
@@ -12,9 +23,27 @@ CYPHER_MODEL_API_KEY = os.getenv("GROQ_API_KEY")
 QUERY_MODEL_API_KEY = os.getenv("GROQ_API_KEY")
 CYPHER_MODEL_API = "groq"
 QUERY_MODEL_API = "groq"
+GRAPH_MODEL = "llama-3.3-70b-versatile"
+GRAPH_MODEL_API_KEY = os.getenv("GROQ_API_KEY")
+GRAPH_MODEL_API = "groq"
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL")
+SESSION_TTL = float(os.getenv("SESSION_TTL", 3600))
+SESSION_MAX_HISTORY_TOKENS = int(os.getenv("SESSION_MAX_HISTORY_TOKENS", 2000))
+# "lazy" serves right away and loads the vector store, embedding model and LLM clients
+# in a background warm-up; "eager" loads the vector store at import and warms up before serving
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")
+# default retrieval: "dense" (FAISS), "lexical" (BM25) or "hybrid" (both, rank-fused)
+SEARCH_TYPE = os.getenv("SEARCH_TYPE", "dense")
+# auto_route requests: chunks closer than this L2 distance count as a vector match
+ROUTER_MAX_DISTANCE = float(os.getenv("ROUTER_MAX_DISTANCE", 1.0))
+# routing decisions include the query text, so they are only logged when a file is configured
+ROUTER_LOG_FILE = os.getenv("ROUTER_LOG_FILE")
+ROUTER_LOG_MAX_BYTES = int(os.getenv("ROUTER_LOG_MAX_BYTES", 10_000_000))
+# also serve cached answers to similar (not just identical) queries naming the same entities
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"
 
 for var_name, value in {
     "CYPHER_MODEL_API_KEY": CYPHER_MODEL_API_KEY,
@@ -26,10 +55,57 @@ for var_name, value in {
     if not value:
         raise EnvironmentError(f"Missing environment variable: {var_name}")
 
-vs = VectorStore()
-vs.load()
+vs = VectorStore(search_type=SEARCH_TYPE)
+if STARTUP_MODE != "lazy":
+    vs.load()
+response_cache = ResponseCache(vs.embeddings, semantic=RESPONSE_CACHE_SEMANTIC)
+router = QueryRouter(vs, ROUTER_MAX_DISTANCE, log_file=ROUTER_LOG_FILE or None, max_log_bytes=ROUTER_LOG_MAX_BYTES)
+# a Redis-compatible store lets several workers share sessions; otherwise they live in this process
+sessions = SessionStore(RedisSessionBackend(SESSION_STORE_URL, SESSION_TTL) if SESSION_STORE_URL
+                        else MemorySessionBackend(ttl=SESSION_TTL),
+                        max_history_tokens=SESSION_MAX_HISTORY_TOKENS)
+# vector jobs (extraction, sync, document add/remove) share the store's write lock
+job_manager = JobManager(store_locks={"vector": vs.write_lock})
+
+def load_vector_store():
+    with vs.write_lock:
+        if vs.vector_store is None:
+            vs.load()
+
+def load_embedding_model():
+    # the first encode loads the model weights and allocates the inference buffers
+    vs.embeddings.embed_query("warm-up")
+
+def load_vector_llm():
+    if llm_hybrid.vector_llm is None:
+        llm_hybrid.get_vector_llm()
+
+def load_graph():
+    if llm_hybrid.graph_llm is None:
+        llm_hybrid.get_graph_llm()
+    # the first graph query would otherwise scan every node
+    llm_hybrid.graph_llm.node_index.get()
+
+# vector-only answers need these; the graph step (Neo4j, Cypher chain) only gates graph and hybrid ones
+VECTOR_STEPS = ("vector_store", "embedding_model", "vector_llm")
+warmup = Warmup([("vector_store", load_vector_store),
+                 ("embedding_model", load_embedding_model),
+                 ("vector_llm", load_vector_llm),
+                 ("graph", load_graph)])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # failed steps keep being retried in the background in both modes
+    warmup.start()
+    if STARTUP_MODE != "lazy":
+        await warmup.wait()
+    yield
+    warmup.cancel()
+    await asyncio.to_thread(job_manager.shutdown)
+    await chat_client.aclose()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="📘 Summarizer API",
     description="""
 A **Retrieval-Augmented Generation (RAG) API** for:
@@ -49,7 +125,7 @@ A **Retrieval-Augmented Generation (RAG) API** for:
 llm_hybrid = HybridLlm(CYPHER_MODEL, CYPHER_MODEL_API_KEY, QUERY_MODEL, QUERY_MODEL_API_KEY,
                        vs, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, None,
                        CYPHER_MODEL_API, QUERY_MODEL_API,
-                       history_tracking=False)
+                       history_tracking=False, sessions=sessions)
 
 class SystemRole(BaseModel):
     prompt: str
@@ -58,11 +134,40 @@ class QueryRequest(BaseModel):
     query: str
     use_vector: bool = True
     use_graph: bool = False
+    use_cache: bool = True
+    session_id: str = None
+    k: int = None
+    fetch_k: int = None
+    lambda_mult: float = None
+    context_tokens: int = None
+    search_type: str = None
+    auto_route: bool = False
+    timings: bool = False
+
+class BatchQueryRequest(BaseModel):
+    queries: list
+    use_vector: bool = True
+    use_graph: bool = False
+    use_cache: bool = True
+    max_concurrency: int = 16
+    k: int = None
+    fetch_k: int = None
+    lambda_mult: float = None
+    context_tokens: int = None
+    search_type: str = None
 
 class GraphAllowedNodesRels(BaseModel):
     allowed_nodes: list = []
     allowed_relationships: list = []
 
+class DocumentRequest(BaseModel):
+    filename: str
+
+class VectorSyncRequest(BaseModel):
+    chunk_size: int = None
+    chunk_overlap: int = None
+    page_wise: bool = None
+
 class PageWiseGraphAllowedNodesRels(BaseModel):
     chunk_size: int = 1000
     chunk_overlap: int = 200
@@ -73,112 +178,437 @@ class PageWiseGraphAllowedNodesRels(BaseModel):
 def set_system_role(request: SystemRole):
     try:
         llm_hybrid.system_role_prompt = request.prompt
-        llm_hybrid.get_llms()
+        # the graph LLM does not use the system role, so it is left to the warm-up
+        llm_hybrid.get_vector_llm()
+        response_cache.clear()
         return {"status": "success", "message": "System role set"}
     except subprocess.CalledProcessError as e:
         return {"status": "error", "message": str(e)}
     
+def reload_vector_store():
+    # vector jobs hold the write lock, so a refresh waits for a running one instead of swapping under it
+    with vs.write_lock:
+        vs.load()
+
 @app.post("/refresh-vector-db")
-def refresh_vector_db():
+async def refresh_vector_db():
     try:
-        vs.load()
+        await asyncio.to_thread(reload_vector_store)
+        response_cache.clear()
         return {"status": "success", "message": "Vector DB refreshed"}
     except subprocess.CalledProcessError as e:
         return {"status": "error", "message": str(e)}
 
-@app.post("/query")
-def query_rag(request: QueryRequest):
-    """Run a RAG query using Vector or Hybrid mode."""
-    if not llm_hybrid.llms_loaded:
-        llm_hybrid.get_llms() 
-    if request.use_vector and request.use_graph:
+def select_llm(request: QueryRequest, route:str=None):
+    use_vector, use_graph = request.use_vector, request.use_graph
+    if route is not None:
+        use_vector, use_graph = route != "graph", route != "vector"
+    # the LLMs are built by the warm-up; wait_for_warmup() answered 503 if a needed one is missing
+    if use_vector and use_graph:
         llm = llm_hybrid
         llm_type = "hybrid"
         system_role = llm.system_role_prompt
-    elif request.use_vector:
+    elif use_vector:
         llm = llm_hybrid.vector_llm
         llm_type = "vector"
         system_role = llm.system_role_prompt
-    elif request.use_graph:
+    elif use_graph:
         llm = llm_hybrid.graph_llm
         llm_type = "graph"
         system_role = None
+    return llm, llm_type, system_role
+
+def retrieval_options(request: QueryRequest, llm_type:str):
+    # graph-only answers do not use vector retrieval
+    if llm_type == "graph":
+        return {}
+    return {name: getattr(request, name) for name in ("k", "fetch_k", "lambda_mult", "context_tokens", "search_type")
+            if getattr(request, name) is not None}
+
+def llm_args(request: QueryRequest, llm_type:str):
+    args = {}
+    # graph-only answers do not use conversation history
+    if request.session_id and llm_type != "graph":
+        args["session_id"] = request.session_id
+    retrieval = retrieval_options(request, llm_type)
+    if retrieval:
+        args["retrieval"] = retrieval
+    return args
+
+async def route_query(request: QueryRequest):
+    """(decision, query embedding) for auto_route requests, (None, None) otherwise."""
+    if not request.auto_route:
+        return None, None
+    # without a graph LLM (the warm-up is still retrying Neo4j) the query is routed as graph_unavailable
+    return await router.route(request.query, llm_hybrid.graph_llm)
+
+def warmup_steps(request):
+    """Warm-up steps a request waits for; auto_route may pick the graph, so it waits for it as well."""
+    auto_route = getattr(request, "auto_route", False)
+    steps = VECTOR_STEPS if request.use_vector or auto_route else ()
+    if request.use_graph or auto_route:
+        steps += ("graph",)
+    return steps
+
+def required_steps(request):
+    """Warm-up steps a request cannot be answered without; auto_route falls back to the vector LLM."""
+    if getattr(request, "auto_route", False):
+        return VECTOR_STEPS
+    return warmup_steps(request)
+
+async def wait_for_warmup(request):
+    # queries arriving during a lazy startup wait for the first attempt of the steps they need
+    # instead of loading models themselves; only the warm-up builds them, so nothing blocks the event loop
+    steps = warmup_steps(request)
+    if steps:
+        await warmup.wait(*steps)
+    required = required_steps(request)
+    if required and not warmup.ready_for(required):
+        # failed steps keep being retried in the background
+        errors = {name: error for name, error in warmup.errors.items() if name in required}
+        raise HTTPException(503, f"Not ready: {errors}")
+
+async def cache_entities(query:str, decision:dict=None):
+    """Graph entities named in query, which a semantic cache hit has to name as well."""
+    if not response_cache.semantic:
+        return None
+    if decision is not None:
+        return decision["signals"]["entities"]
+    if llm_hybrid.graph_llm is None:
+        return None
+    try:
+        return sorted(await llm_hybrid.graph_llm.match_entities(query, llm_fallback=False))
+    except Exception:
+        # the capitalized and numeric terms of the query still have to match
+        return None
+
+async def routed_context(query:str, vector, retrieval:dict=None):
+    # the router already embedded the query, so retrieval reuses that vector
+    found = await asyncio.to_thread(vs.search_vectors, vector.reshape(1, -1), [query], **(retrieval or {}))
+    return "\n".join(found[0])
+
+def cache_namespace(llm_type:str, retrieval:dict=None):
+    # answers retrieved with other settings are cached apart from the defaults
+    return llm_type + (json.dumps(retrieval, sort_keys=True) if retrieval else '')
+
+@app.get("/ready")
+def ready(graph: bool = False):
+    """Readiness probe: 200 once the vector store, embedding model and vector LLM are loaded.
+
+    With `graph=true` the Neo4j connection and Cypher chain are required as well.
+    """
+    status = warmup.status(None if graph else VECTOR_STEPS)
+    return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+@app.post("/query")
+async def query_rag(request: QueryRequest):
+    """Run a RAG query using Vector or Hybrid mode."""
+    trace = start_trace() if request.timings else None
+    await wait_for_warmup(request)
+    decision, query_vector = await route_query(request)
+    llm, llm_type, system_role = select_llm(request, decision and decision["route"])
     query = request.query
-    response = llm.query_llm(query)
-    return {
+    args = llm_args(request, llm_type)
+    namespace = cache_namespace(llm_type, args.get("retrieval"))
+    # answers within a session depend on its history, so they bypass the shared cache
+    use_cache = request.use_cache and "session_id" not in args
+    response, vector, entities = None, None, None
+    if use_cache:
+        entities = await cache_entities(query, decision)
+        with span("response_cache"):
+            response, vector = await asyncio.to_thread(response_cache.get, namespace, query, query_vector, entities)
+    cached = response is not None
+    if not cached:
+        generation = response_cache.invalidations
+        if query_vector is not None and llm_type != "graph":
+            args["context"] = await routed_context(query, query_vector, args.get("retrieval"))
+        response = await llm.query_llm(query, **args)
+        if use_cache:
+            response_cache.put(namespace, query, response, vector, generation, entities)
+    result = {
         "system_role": system_role,
         "llm_type": llm_type,
         "using_sample_vector": vs.using_sample_vector,
         "query": query,
+        "session_id": args.get("session_id"),
+        "cached": cached,
         "response": response
     }
+    if decision is not None:
+        result["route"] = decision
+    if trace is not None:
+        result["timings"] = trace.to_dict()
+    return result
+
+def sse(event:str, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/query/stream")
+async def query_rag_stream(request: QueryRequest, http_request: Request):
+    """Stream a RAG query as Server-Sent Events.
+
+    With `auto_route`, a `route` event with the routing decision comes first.
+    Stage events (`retrieval`, `cypher`, `graph_rows`, `graph_answer`) are sent as soon
+    as they are available, followed by `token` events and a final `done` event with the
+    same fields as /query. Closing the connection cancels the generation.
+    """
+    trace = start_trace() if request.timings else None
+    await wait_for_warmup(request)
+    decision, query_vector = await route_query(request)
+    llm, llm_type, system_role = select_llm(request, decision and decision["route"])
+    query = request.query
+    args = llm_args(request, llm_type)
+    namespace = cache_namespace(llm_type, args.get("retrieval"))
+    use_cache = request.use_cache and "session_id" not in args
+
+    async def events():
+        start = {"system_role": system_role, "llm_type": llm_type,
+                 "using_sample_vector": vs.using_sample_vector, "query": query,
+                 "session_id": args.get("session_id")}
+        if decision is not None:
+            start["route"] = decision
+            yield sse("route", decision)
+        response, vector, entities = None, None, None
+        if use_cache:
+            entities = await cache_entities(query, decision)
+            with span("response_cache"):
+                response, vector = await asyncio.to_thread(response_cache.get, namespace, query, query_vector,
+                                                           entities)
+        if response is not None:
+            if trace is not None:
+                start["timings"] = trace.to_dict()
+            yield sse("done", {**start, "cached": True, "response": response})
+            return
+        generation = response_cache.invalidations
+        if query_vector is not None and llm_type != "graph":
+            args["context"] = await routed_context(query, query_vector, args.get("retrieval"))
+        try:
+            async for event, data in llm.stream_events(query, **args):
+                if await http_request.is_disconnected():
+                    return
+                if event == "token":
+                    yield sse("token", {"text": data})
+                elif event == "done":
+                    if use_cache:
+                        response_cache.put(namespace, query, data, vector, generation, entities)
+                    if trace is not None:
+                        start["timings"] = trace.to_dict()
+                    yield sse("done", {**start, "cached": False, "response": data})
+                else:
+                    yield sse(event, data)
+        except Exception as e:
+            yield sse("error", {"message": f"{type(e).__name__}: {e}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/query/batch")
+async def query_rag_batch(request: BatchQueryRequest):
+    """Answer many queries in one call, streamed back as NDJSON in completion order.
+
+    Identical queries are answered once. Queries are embedded in one batch, which
+    serves both the response cache and a single FAISS search over the whole query
+    matrix; LLM calls then run with at most `max_concurrency` in flight.
+    """
+    await wait_for_warmup(request)
+    llm, llm_type, system_role = select_llm(request)
+    retrieval = retrieval_options(request, llm_type)
+    namespace = cache_namespace(llm_type, retrieval)
+    unique = list(dict.fromkeys(request.queries))
+    positions = {}
+    for i, query in enumerate(request.queries):
+        positions.setdefault(query, []).append(i)
+
+    def lines(query:str, **fields):
+        return ''.join(json.dumps({"index": i, "query": query, "llm_type": llm_type, **fields}, default=str) + "\n"
+                       for i in positions[query])
+
+    async def results():
+        vectors = None
+        if unique and (request.use_cache and response_cache.semantic or request.use_vector):
+            vectors = await asyncio.to_thread(vs.embed_queries, unique)
+        cached = [(None, None)] * len(unique)
+        entities = [None] * len(unique)
+        if request.use_cache:
+            entities = await asyncio.gather(*(cache_entities(query) for query in unique))
+            cached = await asyncio.to_thread(
+                lambda: [response_cache.get(namespace, query, None if vectors is None else vectors[i], entities[i])
+                         for i, query in enumerate(unique)])
+        pending = []
+        for i, query in enumerate(unique):
+            if cached[i][0] is not None:
+                yield lines(query, cached=True, response=cached[i][0])
+            else:
+                pending.append(i)
+
+        contexts = {}
+        if request.use_vector and pending:
+            found = await asyncio.to_thread(vs.search_vectors, vectors[pending], [unique[i] for i in pending],
+                                            **retrieval)
+            contexts = {i: "\n".join(chunks) for i, chunks in zip(pending, found)}
+        semaphore = asyncio.Semaphore(max(1, request.max_concurrency))
+        generation = response_cache.invalidations
+
+        async def answer(i):
+            query = unique[i]
+            async with semaphore:
+                try:
+                    if request.use_vector:
+                        response = await llm.query_llm(query, contexts[i])
+                    else:
+                        response = await llm.query_llm(query)
+                except Exception as e:
+                    return lines(query, error=f"{type(e).__name__}: {e}")
+            if request.use_cache:
+                response_cache.put(namespace, query, response, cached[i][1], generation, entities[i])
+            return lines(query, cached=False, response=response)
+
+        tasks = [asyncio.create_task(answer(i)) for i in pending]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.get("/cache/stats")
+def cache_stats():
+    stats = response_cache.stats()
+    if llm_hybrid.graph_llm is not None:
+        stats["cypher_plans"] = llm_hybrid.graph_llm.plan_cache.stats()
+    stats["sessions"] = sessions.stats()
+    return stats
+
+@app.get("/router/stats")
+def router_stats():
+    """Routes chosen for auto_route requests and the graph pipelines and LLM calls they saved."""
+    return router.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage latencies and LLM prompt/token sizes in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.delete("/sessions/{session_id}")
+def clear_session(session_id: str):
+    if not sessions.clear(session_id):
+        return {"status": "error", "message": f"Session {session_id} not found"}
+    return {"status": "success", "message": f"Session {session_id} cleared"}
+
+@app.post("/cache/clear")
+def clear_cache():
+    response_cache.clear()
+    return {"status": "success", "message": "Response cache cleared"}
+
+def vector_job(page_wise:bool):
+    def run(job):
+        result = vs.rebuild(page_wise, progress=job.progress)
+        response_cache.clear()
+        return result
+    return run
+
+def graph_job(page_wise:bool, chunk_size:int, chunk_overlap:int, nodes:list, rels:list):
+    def run(job):
+        from graph.prepare import Graph
+        gph = Graph(NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, GRAPH_MODEL_API_KEY,
+                    nodes, rels, GRAPH_MODEL, GRAPH_MODEL_API)
+        try:
+            asyncio.run(gph.prepare_graph(page_wise, chunk_size, chunk_overlap, job.progress))
+        finally:
+            gph.close()
+        response_cache.clear()
+        graph_documents = [doc for docs in gph.graph_documents for doc in docs]
+        return {"chunks": len(graph_documents),
+                "nodes": sum(len(doc.nodes) for doc in graph_documents),
+                "relationships": sum(len(doc.relationships) for doc in graph_documents),
+                "write": gph.writer.stats.to_dict(),
+                "extraction_cache": gph.cache_stats}
+    return run
+
+def job_accepted(job, message:str):
+    return {"status": "accepted", "message": message, "job_id": job.id}
 
 @app.post("/vector/extract")
 def generate_vector():
-    try:
-        subprocess.run(["python", "generate_vector.py"], check=True)
-        vs.load()
-        return {"status": "success", "message": "Vector generated"}
-    except subprocess.CalledProcessError as e:
-        return {"status": "error", "message": str(e)}
+    job = job_manager.submit("vector", "vector", vector_job(False), {"page_wise": False})
+    return job_accepted(job, "Vector generation queued")
     
     
 @app.post("/vector/extract-page-wise")
 def generate_vector_pagewise():
-    try:
-        subprocess.run(["python", "generate_vector.py", "--page-wise"], check=True)
-        vs.load()
-        return {"status": "success", "message": "Vector generated with page-wise splitting"}
-    except subprocess.CalledProcessError as e:
-        return {"status": "error", "message": str(e)}
+    job = job_manager.submit("vector", "vector", vector_job(True), {"page_wise": True})
+    return job_accepted(job, "Vector generation with page-wise splitting queued")
     
-@app.post("/graph/extract")
-def generate_graph(request: PageWiseGraphAllowedNodesRels):
-    try:
-        chunk_size = str(request.chunk_size)
-        chunk_overlap = str(request.chunk_overlap)
+def vector_change_job(change):
+    def run(job):
+        changes = change(job)
+        response_cache.clear()
+        return {"changes": changes}
+    return run
 
-        args = ["python", "generate_graph.py", "--chunk-size", chunk_size,
-                "--chunk-overlap", chunk_overlap]
+@app.post("/vector/documents/add")
+def add_vector_document(request: DocumentRequest):
+    path = f"./documents/{os.path.basename(request.filename)}"
+    if not os.path.isfile(path):
+        return {"status": "error", "message": f"{request.filename} not found in documents"}
+    job = job_manager.submit("vector_add", "vector", vector_change_job(
+        lambda job: vs.add_document(path, job.progress)), request.model_dump())
+    return job_accepted(job, "Document addition queued")
 
-        nodes = request.allowed_nodes
-        rels = request.allowed_relationships
+@app.post("/vector/documents/remove")
+def remove_vector_document(request: DocumentRequest):
+    source = os.path.basename(request.filename).split('.')[0]
+    if vs.using_sample_vector or not vs.manifest or source not in vs.manifest["files"]:
+        return {"status": "error", "message": f"{request.filename} is not in the vector DB"}
+    job = job_manager.submit("vector_remove", "vector", vector_change_job(
+        lambda job: vs.remove_document(request.filename)), request.model_dump())
+    return job_accepted(job, "Document removal queued")
 
-        if len(rels) > 0:
-            args.extend(["--allowed_nodes", *nodes])
-        if len(nodes) > 0:
-            args.extend(["--allowed_relationships", *rels])
+@app.post("/vector/sync")
+def sync_vector_documents(request: VectorSyncRequest):
+    job = job_manager.submit("vector_sync", "vector", vector_change_job(
+        lambda job: vs.sync_documents(chunk_size=request.chunk_size, chunk_overlap=request.chunk_overlap,
+                                      page_wise=request.page_wise, progress=job.progress)), request.model_dump())
+    return job_accepted(job, "Vector DB sync queued")
 
-        subprocess.run(args, check=True)
-        vs.load()
-        return {"status": "success", "message": "Graph generated"}
-    except subprocess.CalledProcessError as e:
-        return {"status": "error", "message": f"Subprocess failed: {e}"}
-    except Exception as e:
-        return {"status": "error", "message": f"Unexpected error: {e}"}
+@app.post("/graph/extract")
+def generate_graph(request: PageWiseGraphAllowedNodesRels):
+    params = request.model_dump()
+    job = job_manager.submit("graph", "graph",
+                             graph_job(False, request.chunk_size, request.chunk_overlap,
+                                       request.allowed_nodes, request.allowed_relationships),
+                             {"page_wise": False, **params})
+    return job_accepted(job, "Graph generation queued")
     
     
 @app.post("/graph/extract-page-wise")
 def generate_graph_pagewise(request: GraphAllowedNodesRels):
-    try:
-        args = ["python", "generate_graph.py", "--page-wise"]
-        
-        nodes = request.allowed_nodes
-        rels = request.allowed_relationships
+    params = request.model_dump()
+    job = job_manager.submit("graph", "graph",
+                             graph_job(True, 1000, 200,
+                                       request.allowed_nodes, request.allowed_relationships),
+                             {"page_wise": True, **params})
+    return job_accepted(job, "Graph generation with page-wise splitting queued")
 
-        if len(rels) > 0:
-            args.extend(["--allowed_nodes", *nodes])
-        if len(nodes) > 0:
-            args.extend(["--allowed_relationships", *rels])
+@app.get("/jobs")
+def list_jobs():
+    return {"jobs": job_manager.list()}
 
-        subprocess.run(args, check=True)
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown job: {job_id}"}
+    return job.to_dict()
 
-        vs.load()
-        return {"status": "success", "message": "Graph generated with page-wise splitting"}
-    except subprocess.CalledProcessError as e:
-        return {"status": "error", "message": f"Subprocess failed: {e}"}
-    except Exception as e:
-        return {"status": "error", "message": f"Unexpected error: {e}"}
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown job: {job_id}"}
+    return {"status": "success", "message": "Cancellation requested", "job": job.to_dict()}
 
     
 @app.post("/graph/set-include-types")
@@ -187,6 +617,7 @@ def set_include_types(request: GraphAllowedNodesRels):
         llm_hybrid.allowed_nodes = request.allowed_nodes
         llm_hybrid.allowed_relationships = request.allowed_relationships
         llm_hybrid.get_llms()
+        response_cache.clear()
         return {"status": "success", "message": "Graph include types set"}
     except subprocess.CalledProcessError as e:
         return {"status": "error", "message": str(e)}
\ No newline at end of file
@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from benchmarks.corpus import SCALES, generate_corpus, sample_queries
+from benchmarks.metrics import memory_mb, percentiles, regressions
+
+
+parser = argparse.ArgumentParser(
+        description="End-to-end benchmarks against a mock LLM server and a Neo4j stand-in"
+    )
+parser.add_argument("--scales", nargs='+', default=["small"], choices=list(SCALES),
+                    help="Synthetic corpus sizes to benchmark.")
+parser.add_argument("--modes", nargs='+', default=["vector", "graph", "hybrid"],
+                    choices=["vector", "graph", "hybrid", "auto"],
+                    help="/query modes to load test; auto lets the query router choose per request.")
+parser.add_argument("--concurrency", type=int, nargs='+', default=[1, 8, 32],
+                    help="Concurrent clients for the /query load test.")
+parser.add_argument("--requests", type=int, default=100, help="/query requests per mode and concurrency.")
+parser.add_argument("--search-queries", type=int, default=200, help="similarity_search calls per scale.")
+parser.add_argument("--chunk-size", type=int, default=1000)
+parser.add_argument("--chunk-overlap", type=int, default=200)
+parser.add_argument("--index-type", default="flat", choices=["flat", "ivf_flat", "ivf_pq", "hnsw"])
+parser.add_argument("--latency", type=float, default=0.2, help="Mock LLM seconds before the first token.")
+parser.add_argument("--tokens-per-second", type=float, default=100, help="Mock LLM generation speed.")
+parser.add_argument("--response-tokens", type=int, default=120, help="Mock LLM answer length.")
+parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock LLM requests answered with 429.")
+parser.add_argument("--neo4j-latency", type=float, default=0.002, help="Stand-in seconds per Cypher statement.")
+parser.add_argument("--neo4j-uri", default=None,
+                    help="Benchmark against this Neo4j (a scratch database, NEO4J_USERNAME/NEO4J_PASSWORD "
+                         "from the environment) instead of the stand-in.")
+parser.add_argument("--graph-concurrency", type=int, default=16, help="Chunks extracted concurrently.")
+parser.add_argument("--requests-per-minute", type=float, default=60000, help="Extraction rate limit.")
+parser.add_argument("--llm-port", type=int, default=8100)
+parser.add_argument("--api-port", type=int, default=8200)
+parser.add_argument("--workdir", default=None, help="Workspace for corpora and indexes (default: a temp dir).")
+parser.add_argument("--keep", action="store_true", help="Keep the workspace afterwards.")
+parser.add_argument("--output", default="benchmark_results.json", help="Write the JSON results here.")
+parser.add_argument("--baseline", default=None, help="Earlier results to compare against.")
+parser.add_argument("--tolerance", type=float, default=0.2,
+                    help="Relative p95/p99 or throughput change reported as a regression.")
+
+args = parser.parse_args()
+
+SUMMARIZER_DIR = os.path.dirname(os.path.abspath(__file__))
+MODES = {"vector": {"use_vector": True, "use_graph": False},
+         "graph": {"use_vector": False, "use_graph": True},
+         "hybrid": {"use_vector": True, "use_graph": True},
+         "auto": {"use_vector": True, "use_graph": True, "auto_route": True}}
+
+
+def start(module:str, cwd:str, env:dict, *options):
+    return subprocess.Popen([sys.executable, "-m", module, *map(str, options)], cwd=cwd, env=env)
+
+
+def wait_ready(url:str, process, timeout:float=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=2)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise TimeoutError(f"{url} did not start within {timeout}s")
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def timed(fn, *fn_args, **fn_kwargs):
+    start_time = time.perf_counter()
+    result = fn(*fn_args, **fn_kwargs)
+    return result, time.perf_counter() - start_time
+
+
+def rate(count:int, seconds:float):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def bench_ingestion(paths:list):
+    """Vector ingestion split into extract, chunk, embed and index stages."""
+    from data_processing.loader import file_hash
+    from data_processing.pipeline import PdfPipeline
+    from llm.embedding import Documents, VectorStore
+
+    pipeline = PdfPipeline()
+    documents, extract_s = timed(lambda: list(pipeline.iter_documents(paths)))
+    pages = sum(len(doc_pages) for _, doc_pages in documents)
+
+    splitter = Documents(args.chunk_size, args.chunk_overlap, paths, lazy=True)
+    hashes = {os.path.basename(path).split('.')[0]: file_hash(path) for path in paths}
+    chunks, chunk_s = timed(lambda: [chunk for path, doc_pages in documents
+                                     for chunk in splitter.split_document(os.path.basename(path).split('.')[0],
+                                                                          doc_pages)])
+
+    vs = VectorStore(index_type=args.index_type)
+    vectors, embed_s = timed(vs.embeddings.embed_documents, [chunk.page_content for chunk in chunks])
+
+    def index():
+        vs.manifest = {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap,
+                       "page_wise": False, "files": {}}
+        vs.create_empty_store(vectors)
+        vs.append_chunks(chunks, hashes, vectors)
+        vs.save(vs.db_folder)
+    _, index_s = timed(index)
+
+    total_s = extract_s + chunk_s + embed_s + index_s
+    report = {"documents": len(paths), "pages": pages, "chunks": len(chunks),
+              "extract": {"seconds": round(extract_s, 3), "pages_per_second": rate(pages, extract_s)},
+              "chunk": {"seconds": round(chunk_s, 3), "chunks_per_second": rate(len(chunks), chunk_s)},
+              "embed": {"seconds": round(embed_s, 3), "chunks_per_second": rate(len(chunks), embed_s)},
+              "index": {"seconds": round(index_s, 3), "chunks_per_second": rate(len(chunks), index_s)},
+              "total": {"seconds": round(total_s, 3), "pages_per_second": rate(pages, total_s)},
+              "memory": memory_mb()}
+    return vs, report
+
+
+def bench_search(vs, queries:list):
+    vs.load()
+    report = {"chunks": vs.vector_store.index.ntotal, "index_type": args.index_type}
+    for search_type in vs.search_types:
+        vs.similarity_search(queries[0], search_type=search_type)
+        latencies = []
+        for query in queries:
+            _, seconds = timed(vs.similarity_search, query, search_type=search_type)
+            latencies.append(seconds)
+        # dense latencies stay at the top level so earlier results remain comparable
+        if search_type == "dense":
+            report.update(percentiles(latencies))
+        else:
+            report[search_type] = percentiles(latencies)
+    return report
+
+
+def bench_graph_ingestion(neo4j_url:str):
+    from graph.prepare import Graph
+
+    gph = Graph(neo4j_url, os.getenv("NEO4J_USERNAME", "benchmark"), os.getenv("NEO4J_PASSWORD", "benchmark"),
+                os.environ["GROQ_API_KEY"], [], [], "llama-3.3-70b-versatile", "groq")
+    try:
+        _, seconds = timed(asyncio.run, gph.prepare_graph(
+            False, args.chunk_size, args.chunk_overlap, max_concurrency=args.graph_concurrency,
+            requests_per_minute=args.requests_per_minute, use_cache=False))
+    finally:
+        gph.close()
+    graph_documents = [doc for docs in gph.graph_documents for doc in docs]
+    return {"chunks": len(graph_documents), "seconds": round(seconds, 3),
+            "chunks_per_second": rate(len(graph_documents), seconds),
+            "nodes": sum(len(doc.nodes) for doc in graph_documents),
+            "relationships": sum(len(doc.relationships) for doc in graph_documents),
+            "write": gph.writer.stats.to_dict()}
+
+
+async def bench_queries(url:str, mode:str, queries:list, concurrency:int, requests:int):
+    latencies = []
+    errors = 0
+    pending = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=600, limits=limits) as client:
+
+        async def worker():
+            nonlocal errors
+            for i in pending:
+                payload = {**MODES[mode], "use_cache": False, "query": queries[i % len(queries)]}
+                start_time = time.perf_counter()
+                try:
+                    response = await client.post("/query", json=payload)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start_time)
+                else:
+                    errors += 1
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start_time
+    return {"concurrency": concurrency, **percentiles(latencies), "errors": errors,
+            "requests_per_second": rate(len(latencies), elapsed)}
+
+
+def bench_scale(scale:str, workdir:str, llm_url:str, env:dict):
+    workspace = os.path.join(workdir, scale)
+    paths, corpus_s = timed(generate_corpus, os.path.join(workspace, "documents"),
+                            SCALES[scale]["documents"], SCALES[scale]["pages"])
+    # modules read ./documents, ./vector_db and friends relative to the working directory
+    os.chdir(workspace)
+    report = {"corpus": {**SCALES[scale], "seconds": round(corpus_s, 3)}}
+    print(f"[{scale}] ingesting {len(paths)} documents")
+    vs, report["ingestion"] = bench_ingestion(paths)
+    print(f"[{scale}] similarity_search")
+    report["search"] = bench_search(vs, sample_queries(args.search_queries, seed=1))
+    vs.close()
+
+    neo4j_url = args.neo4j_uri or f"standin://{os.path.join(workspace, 'graph.sqlite')}?latency={args.neo4j_latency}"
+    env = {**env, "NEO4J_URI": neo4j_url}
+    os.environ["NEO4J_URI"] = neo4j_url
+    if {"graph", "hybrid"} & set(args.modes):
+        print(f"[{scale}] graph extraction")
+        report["graph_ingestion"] = bench_graph_ingestion(neo4j_url)
+
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    server = start("benchmarks.serve", workspace, env, "--port", args.api_port)
+    try:
+        wait_ready(f"{api_url}/jobs", server)
+        queries = sample_queries(max(args.requests, 50), seed=2)
+        report["query"] = {}
+        for mode in args.modes:
+            # first request per mode loads the LLM clients, graph chain and node index
+            asyncio.run(bench_queries(api_url, mode, queries, 1, 1))
+        report["memory"] = {"worker_idle": memory_mb(server.pid)}
+        for mode in args.modes:
+            report["query"][mode] = {}
+            for concurrency in args.concurrency:
+                print(f"[{scale}] /query {mode} x{concurrency}")
+                report["query"][mode][f"c{concurrency}"] = asyncio.run(
+                    bench_queries(api_url, mode, queries, concurrency, args.requests))
+        report["memory"]["worker_after_load"] = memory_mb(server.pid)
+    finally:
+        stop(server)
+    report["memory"]["benchmark_process"] = memory_mb()
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=SUMMARIZER_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    output = os.path.abspath(args.output)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="summarizer-benchmark-"))
+    os.makedirs(workdir, exist_ok=True)
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    env = {**os.environ, "GROQ_API_BASE": llm_url,
+           "GROQ_API_KEY": os.getenv("GROQ_API_KEY") or "benchmark",
+           "NEO4J_USERNAME": os.getenv("NEO4J_USERNAME") or "benchmark",
+           "NEO4J_PASSWORD": os.getenv("NEO4J_PASSWORD") or "benchmark",
+           "PYTHONPATH": os.pathsep.join(filter(None, [SUMMARIZER_DIR, os.getenv("PYTHONPATH")]))}
+    # the in-process graph extraction talks to the same mock
+    os.environ.update({key: env[key] for key in ("GROQ_API_BASE", "GROQ_API_KEY", "NEO4J_USERNAME", "NEO4J_PASSWORD")})
+
+    results = {"meta": {"started": datetime.datetime.now().isoformat(timespec="seconds"),
+                        "git_commit": git_commit(), "python": platform.python_version(),
+                        "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                        "settings": vars(args)},
+               "scales": {}}
+    mock = start("benchmarks.mock_llm", SUMMARIZER_DIR, env, "--port", args.llm_port,
+                 "--latency", args.latency, "--tokens-per-second", args.tokens_per_second,
+                 "--response-tokens", args.response_tokens, "--error-rate", args.error_rate)
+    try:
+        wait_ready(f"{llm_url}/health", mock)
+        # graph.prepare lists ./documents on import, so the stand-in is installed from a workspace
+        os.makedirs(os.path.join(workdir, args.scales[0], "documents"), exist_ok=True)
+        os.chdir(os.path.join(workdir, args.scales[0]))
+        from benchmarks.neo4j_standin import install
+        install()
+        for scale in args.scales:
+            results["scales"][scale] = bench_scale(scale, workdir, llm_url, env)
+        results["mock_llm"] = httpx.get(f"{llm_url}/stats").json()
+    finally:
+        stop(mock)
+        os.chdir(SUMMARIZER_DIR)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            results["regressions"] = regressions(json.load(file), results, args.tolerance)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=4)
+    print(json.dumps(results["scales"], indent=4))
+    print(f"Results written to {output}")
+    if results.get("regressions"):
+        print(f"{len(results['regressions'])} regressions beyond {args.tolerance:.0%}:")
+        for regression in results["regressions"]:
+            print(f"  {regression['metric']}: {regression['baseline']} -> {regression['current']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
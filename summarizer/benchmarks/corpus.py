@@ -0,0 +1,110 @@
+import os
+import random
+
+
+SCALES = {
+    "small": {"documents": 5, "pages": 4},
+    "medium": {"documents": 40, "pages": 10},
+    "large": {"documents": 200, "pages": 20},
+}
+
+BANKS = ["Northbridge Bank", "Coastal Savings", "Harbor Trust", "Summit Capital", "Redwood Finance",
+         "Granite Mutual", "Lakeside Credit", "Pioneer Bancorp", "Meridian Bank", "Atlas Lending"]
+REGULATORS = ["Reserve Authority", "Banking Commission", "Securities Board", "Conduct Authority",
+              "Deposit Insurer"]
+REGULATIONS = ["Capital Adequacy Rules", "Liquidity Coverage Ratio", "Know Your Customer Norms",
+               "Anti Money Laundering Act", "Fair Lending Code", "Data Protection Standard"]
+ACTIONS = ["imposed a penalty on", "issued a warning to", "approved the merger of", "audited",
+           "revoked the licence of", "extended a deadline for"]
+AMOUNTS = ["2 million", "450,000", "12 million", "800,000", "5.5 million"]
+FILLER = ["The review covered lending, deposits and reporting.",
+          "Management submitted a remediation plan within thirty days.",
+          "The board accepted the findings without objection.",
+          "Further inspections are scheduled for the next quarter.",
+          "Customers were notified of the changes by letter.",
+          "The ruling takes effect at the start of the fiscal year."]
+
+QUERY_TEMPLATES = ["What penalties did {regulator} impose on {bank}?",
+                   "Which rules did {bank} breach?",
+                   "How is {bank} related to {regulator}?",
+                   "Summarize the findings against {bank} under the {regulation}.",
+                   "Which banks were audited by {regulator}?"]
+
+
+def sentence(rng:random.Random):
+    if rng.random() < 0.3:
+        return rng.choice(FILLER)
+    return (f"The {rng.choice(REGULATORS)} {rng.choice(ACTIONS)} {rng.choice(BANKS)} under the "
+            f"{rng.choice(REGULATIONS)}, citing an amount of {rng.choice(AMOUNTS)}.")
+
+
+def page_text(rng:random.Random, words:int=450):
+    sentences = []
+    count = 0
+    while count < words:
+        text = sentence(rng)
+        sentences.append(text)
+        count += len(text.split())
+    return ' '.join(sentences)
+
+
+def wrap(text:str, width:int=90):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    if line:
+        lines.append(line)
+    return lines
+
+
+def escape(text:str):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path:str, pages:list):
+    """Write a minimal text-only PDF (Helvetica, one content stream per page) that pypdf can extract."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = ' '.join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    font = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                       f"/Resources << /Font << /F1 {font} 0 R >> >> >>".encode())
+        lines = ' '.join(f"({escape(line)}) Tj T*" for line in wrap(text))
+        stream = f"BT /F1 10 Tf 40 760 Td 12 TL {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b''.join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode()
+    with open(path, 'wb') as file:
+        file.write(out)
+
+
+def generate_corpus(folder:str, documents:int, pages:int, seed:int=0):
+    """Write `documents` synthetic regulatory PDFs of `pages` pages each; returns their paths."""
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(documents):
+        path = os.path.join(folder, f"report_{i:04d}.pdf")
+        make_pdf(path, [page_text(rng) for _ in range(pages)])
+        paths.append(path)
+    return paths
+
+
+def sample_queries(count:int, seed:int=0):
+    rng = random.Random(seed)
+    return [rng.choice(QUERY_TEMPLATES).format(bank=rng.choice(BANKS), regulator=rng.choice(REGULATORS),
+                                               regulation=rng.choice(REGULATIONS))
+            for _ in range(count)]
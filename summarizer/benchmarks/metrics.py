@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def percentiles(seconds:list):
+    """Latency summary in milliseconds."""
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds, dtype="float64") * 1000
+    return {"count": len(ms), "mean_ms": round(float(ms.mean()), 3),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3), "max_ms": round(float(ms.max()), 3)}
+
+
+def memory_mb(pid="self"):
+    """Current (VmRSS) and peak (VmHWM) resident memory of a process, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as file:
+            fields = dict(line.split(':', 1) for line in file if ':' in line)
+    except OSError:
+        return {"rss_mb": None, "peak_rss_mb": None}
+    def mb(name):
+        return round(int(fields[name].split()[0]) / 1024, 1) if name in fields else None
+    return {"rss_mb": mb("VmRSS"), "peak_rss_mb": mb("VmHWM")}
+
+
+def flatten(data:dict, prefix:str=""):
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def regressions(baseline:dict, current:dict, tolerance:float=0.2):
+    """Metrics that got worse by more than `tolerance`: latencies that grew, throughputs that shrank."""
+    before, after = flatten(baseline.get("scales", {})), flatten(current.get("scales", {}))
+    found = []
+    for path, old in before.items():
+        new = after.get(path)
+        if new is None or not old:
+            continue
+        if path.endswith(("p95_ms", "p99_ms")) and new > old * (1 + tolerance):
+            found.append({"metric": path, "baseline": old, "current": new})
+        elif path.endswith("per_second") and new < old * (1 - tolerance):
+            found.append({"metric": path, "baseline": old, "current": new})
+    return found
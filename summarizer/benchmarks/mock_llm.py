@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+
+ENTITY = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)+\b")
+MAPPING = re.compile(r"^(.+?) → \(", re.M)
+WORDS = ("the bank was found to have breached reporting requirements and the regulator imposed a "
+         "penalty after reviewing liquidity capital and customer due diligence records").split()
+
+
+class MockSettings:
+
+    def __init__(self, latency:float=0.2, tokens_per_second:float=100, response_tokens:int=120,
+                 error_rate:float=0.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+
+
+settings = MockSettings()
+stats = {"requests": 0, "errors": 0, "kinds": {}}
+app = FastAPI(title="Mock OpenAI-compatible chat completions")
+
+
+def prompt_text(payload:dict):
+    return '\n'.join(str(message.get("content") or '') for message in payload.get("messages", []))
+
+
+def request_kind(payload:dict):
+    if payload.get("tools"):
+        return "extraction"
+    if "Cypher" in prompt_text(payload):
+        return "cypher"
+    return "answer"
+
+
+def answer_text(tokens:int):
+    return ' '.join(WORDS[i % len(WORDS)] for i in range(tokens))
+
+
+def cypher_text(payload:dict):
+    mapping = MAPPING.search(prompt_text(payload))
+    if mapping:
+        name = mapping.group(1).strip().replace("'", "")
+        return (f"MATCH (n)-[r]-(m) WHERE toLower(n.id) = toLower('{name}') "
+                "RETURN n.id AS source, type(r) AS relationship, m.id AS target LIMIT 25")
+    return "MATCH (n)-[r]->(m) RETURN n.id AS source, type(r) AS relationship, m.id AS target LIMIT 25"
+
+
+def enum_of(schema:dict, *path):
+    for key in path:
+        schema = schema.get(key, {}) if isinstance(schema, dict) else {}
+    return schema.get("enum") if isinstance(schema, dict) else None
+
+
+def extraction_call(payload:dict):
+    """A tool call in LLMGraphTransformer's schema: entities are the capitalized phrases of the chunk."""
+    tool = payload["tools"][0]["function"]
+    schema = tool.get("parameters", {})
+    defs = schema.get("$defs", {})
+    node_types = enum_of(defs.get("SimpleNode", {}), "properties", "type") or ["Entity"]
+    rel_types = enum_of(defs.get("SimpleRelationship", {}), "properties", "type") or ["RELATED_TO"]
+    text = payload["messages"][-1].get("content") or ''
+    names = list(dict.fromkeys(ENTITY.findall(text)))[:12]
+    nodes = [{"id": name, "type": node_types[hash(name) % len(node_types)]} for name in names]
+    relationships = [{"source_node_id": source["id"], "source_node_type": source["type"],
+                      "target_node_id": target["id"], "target_node_type": target["type"],
+                      "type": rel_types[i % len(rel_types)]}
+                     for i, (source, target) in enumerate(zip(nodes, nodes[1:]))]
+    return {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+            "function": {"name": tool["name"], "arguments": json.dumps({"nodes": nodes,
+                                                                        "relationships": relationships})}}
+
+
+def completion(payload:dict, message:dict, tokens:int):
+    return {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+            "model": payload.get("model", "mock"),
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": len(prompt_text(payload)) // 4, "completion_tokens": tokens,
+                      "total_tokens": len(prompt_text(payload)) // 4 + tokens}}
+
+
+def chunk(payload:dict, delta:dict, finish_reason:str=None):
+    data = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": payload.get("model", "mock"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+    return f"data: {json.dumps(data)}\n\n"
+
+
+async def stream_tokens(payload:dict, tokens:list):
+    yield chunk(payload, {"role": "assistant", "content": ""})
+    for token in tokens:
+        await asyncio.sleep(1 / settings.tokens_per_second)
+        yield chunk(payload, {"content": token})
+    yield chunk(payload, {}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    kind = request_kind(payload)
+    stats["requests"] += 1
+    stats["kinds"][kind] = stats["kinds"].get(kind, 0) + 1
+    if random.random() < settings.error_rate:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Rate limit reached (mock)", "type": "rate_limit"}},
+                            status_code=429, headers={"Retry-After": "0"})
+    await asyncio.sleep(settings.latency)
+
+    if kind == "extraction":
+        message = {"role": "assistant", "content": None, "tool_calls": [extraction_call(payload)]}
+        tokens = len(message["tool_calls"][0]["function"]["arguments"]) // 4
+    else:
+        content = cypher_text(payload) if kind == "cypher" else answer_text(settings.response_tokens)
+        message = {"role": "assistant", "content": content}
+        tokens = len(content.split())
+    if payload.get("stream") and kind != "extraction":
+        words = message["content"].split(' ')
+        return StreamingResponse(stream_tokens(payload, [w if i == 0 else f" {w}" for i, w in enumerate(words)]),
+                                 media_type="text/event-stream")
+    await asyncio.sleep(tokens / settings.tokens_per_second)
+    return completion(payload, message, tokens)
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+def get_stats():
+    return {**stats, "settings": vars(settings)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Groq-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="Generation speed.")
+    parser.add_argument("--response-tokens", type=int, default=120, help="Length of answers.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429.")
+    args = parser.parse_args()
+    settings.__init__(args.latency, args.tokens_per_second, args.response_tokens, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,233 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+from langchain_neo4j.graphs.graph_store import GraphStore
+
+
+SCHEME = "standin://"
+NODE_MERGE = re.compile(r"MERGE \(n:`([^`]*)` \{id: row\.id\}\)")
+RELATIONSHIP_MERGE = re.compile(r"MATCH \(s:`([^`]*)`.*MATCH \(t:`([^`]*)`.*MERGE \(s\)-\[r:`([^`]*)`\]->\(t\)", re.S)
+STRING_LITERAL = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+
+
+class StandInStore:
+    """SQLite-backed property graph answering the Cypher statements this repo issues.
+
+    Writes from GraphWriter, the node index query and schema reads are handled
+    exactly; any other read (LLM-generated Cypher) returns the relationships
+    around the string literals and parameters it mentions, which gives
+    realistic result sizes without a Cypher engine. The file can be shared
+    between processes, e.g. an ingestion run and an API worker.
+    """
+
+    def __init__(self, path:str, latency:float=0.0):
+        self.path = path
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS nodes (label TEXT NOT NULL, id TEXT NOT NULL, "
+                                "properties TEXT NOT NULL, PRIMARY KEY (label, id))")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS relationships (source_label TEXT NOT NULL, "
+                                "source TEXT NOT NULL, type TEXT NOT NULL, target_label TEXT NOT NULL, "
+                                "target TEXT NOT NULL, properties TEXT NOT NULL, "
+                                "PRIMARY KEY (source_label, source, type, target_label, target))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS relationships_target ON relationships (lower(target))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS relationships_source ON relationships (lower(source))")
+        self.connection.commit()
+        self.queries = 0
+
+    def run(self, query:str, params:dict=None):
+        params = params or {}
+        if self.latency:
+            time.sleep(self.latency)
+        self.queries += 1
+        with self._lock:
+            if query.lstrip().upper().startswith(("CREATE CONSTRAINT", "CREATE INDEX")):
+                return []
+            node = NODE_MERGE.search(query)
+            if node:
+                self.connection.executemany(
+                    "INSERT INTO nodes (label, id, properties) VALUES (?, ?, ?) "
+                    "ON CONFLICT (label, id) DO UPDATE SET properties = excluded.properties",
+                    [(node.group(1), str(row["id"]), json.dumps(row.get("properties") or {})) for row in params["rows"]])
+                self.connection.commit()
+                return []
+            relationship = RELATIONSHIP_MERGE.search(query)
+            if relationship:
+                source_label, target_label, rel_type = relationship.groups()
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO relationships VALUES (?, ?, ?, ?, ?, ?)",
+                    [(source_label, str(row["source"]), rel_type, target_label, str(row["target"]),
+                      json.dumps(row.get("properties") or {})) for row in params["rows"]])
+                self.connection.commit()
+                return []
+            if "labels(n) AS labels" in query:
+                rows = self.connection.execute("SELECT id, label FROM nodes").fetchall()
+                return [{"node_id": node_id, "labels": [label]} for node_id, label in rows]
+            return self.match(query, params)
+
+    def match(self, query:str, params:dict):
+        terms = {(match.group(1) if match.group(1) is not None else match.group(2)).lower()
+                 for match in STRING_LITERAL.finditer(query)}
+        terms.update(str(value).lower() for value in params.values() if isinstance(value, str))
+        columns = "source, type, target"
+        if terms:
+            placeholders = ','.join('?' * len(terms))
+            rows = self.connection.execute(
+                f"SELECT {columns} FROM relationships WHERE lower(source) IN ({placeholders}) "
+                f"OR lower(target) IN ({placeholders}) LIMIT 100", (*terms, *terms)).fetchall()
+        else:
+            rows = self.connection.execute(f"SELECT {columns} FROM relationships LIMIT 25").fetchall()
+        return [{"source": source, "relationship": rel_type, "target": target} for source, rel_type, target in rows]
+
+    def structured_schema(self):
+        with self._lock:
+            labels = [row[0] for row in self.connection.execute("SELECT DISTINCT label FROM nodes")]
+            patterns = self.connection.execute(
+                "SELECT DISTINCT source_label, type, target_label FROM relationships").fetchall()
+            types = sorted({rel_type for _, rel_type, _ in patterns})
+        return {"node_props": {label: [{"property": "id", "type": "STRING"}] for label in labels},
+                "rel_props": {rel_type: [] for rel_type in types},
+                "relationships": [{"start": start, "type": rel_type, "end": end} for start, rel_type, end in patterns],
+                "metadata": {"constraint": [], "index": []}}
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM nodes")
+            self.connection.execute("DELETE FROM relationships")
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class StandInResult:
+
+    def __init__(self, records:list):
+        self.records = records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def data(self):
+        return self.records
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def consume(self):
+        return None
+
+
+class StandInSession:
+
+    def __init__(self, store:StandInStore):
+        self.store = store
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters:dict=None, **kwargs):
+        return StandInResult(self.store.run(str(getattr(query, "text", query)), {**(parameters or {}), **kwargs}))
+
+    def execute_write(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
+
+    execute_read = execute_write
+
+    def close(self):
+        pass
+
+
+class StandInDriver:
+
+    def __init__(self, store:StandInStore):
+        self.store = store
+
+    def session(self, **kwargs):
+        return StandInSession(self.store)
+
+    def execute_query(self, query, parameters_:dict=None, database_:str=None, **kwargs):
+        records = self.store.run(str(getattr(query, "text", query)), {**(parameters_ or {}), **kwargs})
+        return records, None, list(records[0]) if records else []
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
+
+
+stores = {}
+stores_lock = threading.Lock()
+
+def open_store(url:str):
+    """standin:///path/to/graph.sqlite?latency=0.002 -> the store for that file, shared within the process."""
+    parsed = urlparse(url)
+    path = os.path.abspath(parsed.path or "./graph_standin.sqlite")
+    latency = float(parse_qs(parsed.query).get("latency", [0])[0])
+    with stores_lock:
+        if path not in stores:
+            stores[path] = StandInStore(path, latency)
+        return stores[path]
+
+
+class StandInGraph(GraphStore):
+    """Drop-in for langchain_neo4j.Neo4jGraph backed by a StandInStore."""
+
+    def __init__(self, url:str=None, username:str=None, password:str=None, database:str=None, **kwargs):
+        self.store = open_store(url or SCHEME)
+        self._driver = StandInDriver(self.store)
+        self._database = database
+        self._enhanced_schema = False
+        self.structured_schema = {}
+        self.schema = ""
+        self.refresh_schema()
+
+    @property
+    def get_schema(self):
+        return self.schema
+
+    @property
+    def get_structured_schema(self):
+        return self.structured_schema
+
+    def query(self, query:str, params:dict={}, session_params:dict=None):
+        return self.store.run(query, params)
+
+    def refresh_schema(self):
+        self.structured_schema = self.store.structured_schema()
+        nodes = '\n'.join(f"{label} {{id: STRING}}" for label in self.structured_schema["node_props"])
+        relationships = '\n'.join(f"(:{rel['start']})-[:{rel['type']}]->(:{rel['end']})"
+                                  for rel in self.structured_schema["relationships"])
+        self.schema = (f"Node properties:\n{nodes}\nRelationship properties:\n\n"
+                       f"The relationships:\n{relationships}")
+
+    def add_graph_documents(self, graph_documents, include_source:bool=False, baseEntityLabel:bool=False):
+        from graph.writer import GraphWriter
+        GraphWriter(self._driver, self._database).write(graph_documents)
+
+    def close(self):
+        pass
+
+
+def install():
+    """Route Neo4j URLs starting with standin:// to the stand-in; other URLs still reach Neo4j."""
+    import graph.prepare as prepare
+    neo4j_graph = prepare.Neo4jGraph
+
+    def connect(url=None, username=None, password=None, **kwargs):
+        if str(url).startswith(SCHEME):
+            return StandInGraph(url, username, password, **kwargs)
+        return neo4j_graph(url=url, username=username, password=password, **kwargs)
+
+    prepare.Neo4jGraph = connect
@@ -0,0 +1,16 @@
+import argparse
+import uvicorn
+from benchmarks.neo4j_standin import install
+
+
+# Runs app.py as one API worker with standin:// Neo4j URLs served by the stand-in.
+# Started by benchmark.py with the benchmark workspace as working directory.
+parser = argparse.ArgumentParser(description="Serve the API for benchmarks")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8200)
+args = parser.parse_args()
+
+install()
+import app
+
+uvicorn.run(app.app, host=args.host, port=args.port, log_level="warning")
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import os
 from data_processing.utils import Pdf
@@ -5,12 +6,17 @@ from data_processing.utils import Pdf
 class Loader(Pdf):
     def __init__(self, path:str):
         super().__init__()
-        self.doc = tuple(enumerate(self.read(path).split('\n')))
+        self.text = self.read(path)
         self.filename = os.path.basename(path).split('.')[0]
 
+    @property
+    def doc(self):
+        return tuple(enumerate(self.text.split('\n')))
+
     def start_from_line(self, idx:int=0):
-        doc = self.doc
-        doc = '\n'.join([i[1] for i in doc][idx:])
+        if idx == 0:
+            return self.text
+        doc = '\n'.join(self.text.split('\n')[idx:])
         return doc
     
 
@@ -19,10 +25,21 @@ def json_loader(path):
         data = json.load(file)
     return data
 
-def json_dumper(data, path):
+def json_dumper(data, path, indent:int=4):
     with open(path, 'w') as file:
-        json.dump(data, file, indent=4)
+        json.dump(data, file, indent=indent)
+
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
 
 class PdfFiles:
     pdfs = [f"./documents/{i}" for i in os.listdir("./documents")]
+
+    @staticmethod
+    def list_pdfs(folder="./documents"):
+        return [f"{folder}/{i}" for i in sorted(os.listdir(folder))]
     
\ No newline at end of file
@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from data_processing.utils import clean_text_regex
+
+
+def page_count(path):
+    return len(PdfReader(path).pages)
+
+
+def extract_pages(path, start, stop):
+    reader = PdfReader(path)
+    return [clean_text_regex(reader.pages[i].extract_text()) for i in range(start, stop)]
+
+
+class ExtractionStats:
+
+    def __init__(self):
+        self.documents = 0
+        self.pages = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (f"Extracted {self.pages} pages from {self.documents} documents in "
+                f"{self.elapsed:.1f}s ({self.pages_per_second:.1f} pages/s)")
+
+
+class PdfPipeline:
+
+    def __init__(self, max_workers:int=None, max_in_flight:int=4, pages_per_task:int=8,
+                 start_method:str="spawn"):
+        self.max_workers = max_workers or os.cpu_count()
+        # forking a process with live torch/FAISS/HTTP client threads (the API, or the CLI
+        # once the embedding model is loaded) can deadlock the children, so workers are spawned
+        self.start_method = start_method
+        self.max_in_flight = max_in_flight
+        self.pages_per_task = pages_per_task
+        self.stats = ExtractionStats()
+
+    def submit(self, pool, path):
+        n_pages = page_count(path)
+        futures = [pool.submit(extract_pages, path, start, min(start + self.pages_per_task, n_pages))
+                   for start in range(0, n_pages, self.pages_per_task)]
+        return path, futures
+
+    def iter_documents(self, paths):
+        """Yield (path, cleaned pages) per document, in input order.
+
+        Page ranges of up to max_in_flight documents are extracted in parallel;
+        the next document is only scheduled once one has been handed over,
+        which bounds how much extracted text is held in memory.
+        """
+        self.stats = ExtractionStats()
+        paths = iter(paths)
+        in_flight = deque()
+        with ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context(self.start_method)) as pool:
+            for path in paths:
+                in_flight.append(self.submit(pool, path))
+                if len(in_flight) >= self.max_in_flight:
+                    break
+            while in_flight:
+                path, futures = in_flight.popleft()
+                pages = [page for future in futures for page in future.result()]
+                next_path = next(paths, None)
+                if next_path is not None:
+                    in_flight.append(self.submit(pool, next_path))
+                self.stats.documents += 1
+                self.stats.pages += len(pages)
+                yield path, pages
@@ -21,6 +21,20 @@ parser.add_argument("--chunk-size", type=int, default=1000,
                     help="Chunk size for splitting text.")
 parser.add_argument("--chunk-overlap", type=int, default=200,
                     help="Chunk overlap size.",)
+parser.add_argument("--max-concurrency", type=int, default=8,
+                    help="Chunks sent to the LLM concurrently.")
+parser.add_argument("--requests-per-minute", type=float, default=None,
+                    help="LLM request rate limit (defaults to a per-provider value).")
+parser.add_argument("--max-retries", type=int, default=5,
+                    help="Retries per chunk before the run fails.")
+parser.add_argument("--batch-size", type=int, default=20,
+                    help="Extracted chunks written to Neo4j per batch.")
+parser.add_argument("--write-batch-size", type=int, default=1000,
+                    help="Rows per UNWIND ... MERGE statement when writing to Neo4j.")
+parser.add_argument("--from-cache", action="store_true",
+                    help="Rebuild the graph from cached extractions only, without calling the LLM.")
+parser.add_argument("--no-cache", action="store_true",
+                    help="Do not reuse or store extractions in ./graph_extraction_cache.sqlite.")
 
 
 args = parser.parse_args()
@@ -36,7 +50,19 @@ async def main():
                 args.allowed_nodes, args.allowed_relationships,
                 "llama-3.3-70b-versatile", 'groq')
 
-    await gph.prepare_graph(args.page_wise, args.chunk_size, args.chunk_overlap)
+    if args.from_cache:
+        gph.rebuild_from_cache(write_batch_size=args.write_batch_size)
+    else:
+        await gph.prepare_graph(args.page_wise, args.chunk_size, args.chunk_overlap,
+                                max_concurrency=args.max_concurrency,
+                                requests_per_minute=args.requests_per_minute,
+                                max_retries=args.max_retries, batch_size=args.batch_size,
+                                use_cache=not args.no_cache,
+                                write_batch_size=args.write_batch_size)
+        if gph.cache_stats is not None:
+            print(f"Extraction cache: {gph.cache_stats['hits']} hits, {gph.cache_stats['misses']} misses")
+    print(gph.writer.stats)
+    gph.close()
 
 
 if __name__ == "__main__":
@@ -1,23 +1,75 @@
 import argparse
-from llm.embedding import Documents, VectorStore
+from data_processing.pipeline import PdfPipeline
+from llm.embedding import VectorStore
+from llm.embedding_engine import EmbeddingEngine
 
 
 parser = argparse.ArgumentParser(
         description="Generate vector store"
     )
 parser.add_argument(
-        "--page-wise", action="store_true",
-        help="Create vector chunks page wise"
+        "--page-wise", action=argparse.BooleanOptionalAction, default=None,
+        help="Create vector chunks page wise (--incremental keeps the store's chunking unless given)"
     )
+parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only embed new or changed documents and drop removed ones"
+    )
+parser.add_argument("--index-type", default="flat", choices=VectorStore.index_types,
+                    help="FAISS index type.")
+parser.add_argument("--nlist", type=int, default=1024,
+                    help="Number of IVF cells (ivf_flat, ivf_pq).")
+parser.add_argument("--nprobe", type=int, default=16,
+                    help="IVF cells visited per search (ivf_flat, ivf_pq).")
+parser.add_argument("--pq-m", type=int, default=16,
+                    help="PQ sub-quantizers; must divide the embedding dimension (ivf_pq).")
+parser.add_argument("--pq-nbits", type=int, default=8,
+                    help="Bits per PQ code (ivf_pq).")
+parser.add_argument("--hnsw-m", type=int, default=32,
+                    help="Neighbours per HNSW node (hnsw).")
+parser.add_argument("--ef-construction", type=int, default=200,
+                    help="HNSW build-time candidate list size (hnsw).")
+parser.add_argument("--ef-search", type=int, default=64,
+                    help="HNSW search-time candidate list size (hnsw).")
+parser.add_argument("--workers", type=int, default=None,
+                    help="PDF extraction processes (defaults to the CPU count).")
+parser.add_argument("--max-in-flight", type=int, default=4,
+                    help="Documents extracted concurrently; bounds memory use.")
+parser.add_argument("--embedding-batch-size", type=int, default=64,
+                    help="Texts per embedding model forward pass.")
+parser.add_argument("--embedding-workers", type=int, default=1,
+                    help="CPU processes used to shard embedding of large batches.")
+parser.add_argument("--embedding-backend", default="torch", choices=["torch", "onnx", "openvino"],
+                    help="sentence-transformers backend.")
+parser.add_argument("--embedding-model-file", default=None,
+                    help="Exported/quantized model file for the onnx or openvino backend.")
+parser.add_argument("--no-embedding-cache", action="store_true",
+                    help="Do not reuse or store embeddings in ./embedding_cache.")
+
+
+def main():
+    args = parser.parse_args()
 
-args = parser.parse_args()
+    embeddings = EmbeddingEngine(batch_size=args.embedding_batch_size,
+                                 num_workers=args.embedding_workers,
+                                 backend=args.embedding_backend,
+                                 model_file=args.embedding_model_file,
+                                 cache_folder=None if args.no_embedding_cache else "./embedding_cache")
+    vs = VectorStore(index_type=args.index_type, nlist=args.nlist, nprobe=args.nprobe,
+                     pq_m=args.pq_m, pq_nbits=args.pq_nbits, hnsw_m=args.hnsw_m,
+                     ef_construction=args.ef_construction, ef_search=args.ef_search,
+                     embeddings=embeddings)
 
-documents = Documents()
+    if args.incremental:
+        vs.load()
+        print(vs.sync_documents(page_wise=args.page_wise))
+    else:
+        # built next to vector_db/ and swapped in, so API workers serving the old files are not affected
+        pipeline = PdfPipeline(args.workers, args.max_in_flight)
+        vs.rebuild(bool(args.page_wise), pipeline=pipeline)
+        print(pipeline.stats)
+    embeddings.close()
 
-if args.page_wise:
-    documents.prepare_splitted_document_chunks_pagewise()
-else:
-    documents.prepare_splitted_document_chunks()
 
-vs = VectorStore()
-vs.add_documents(documents)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import difflib
+import re
+from collections import deque
+
+
+def normalize(text:str):
+    text = re.sub(r"[.'\-]", "", str(text).lower())
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return text.strip()
+
+
+class EntityMatcher:
+    """Token-level Aho-Corasick automaton over normalized entity names."""
+
+    def __init__(self, names:list, fuzzy:bool=False, fuzzy_cutoff:float=0.88,
+                 max_token_names:int=200, max_candidates:int=50):
+        self.names = []
+        self.fuzzy = fuzzy
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # tokens shared by more names than this ("bank", "ltd") do not select fuzzy candidates
+        self.max_token_names = max_token_names
+        self.max_candidates = max_candidates
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.token_index = {}
+        self.token_buckets = {}
+        self.name_tokens = []
+        for name in names:
+            self.add(name)
+        self.build_failure_links()
+
+    def add(self, name):
+        tokens = normalize(name).split()
+        if not tokens:
+            return
+        name_idx = len(self.names)
+        self.names.append(name)
+        self.name_tokens.append(tokens)
+        state = 0
+        for token in tokens:
+            if token not in self.token_index:
+                self.token_buckets.setdefault((token[0], len(token)), []).append(token)
+            self.token_index.setdefault(token, set()).add(name_idx)
+            nxt = self.goto[state].get(token)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][token] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append(name_idx)
+
+    def build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(token, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def exact_matches(self, tokens:list):
+        found = []
+        state = 0
+        for token in tokens:
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            found.extend(self.output[state])
+        return found
+
+    def similar_tokens(self, token:str):
+        # typos rarely touch the first character, so only same-initial tokens
+        # of nearly the same length are compared
+        vocabulary = []
+        for length in range(len(token) - 1, len(token) + 2):
+            vocabulary += self.token_buckets.get((token[0], length), [])
+        return difflib.get_close_matches(token, vocabulary, n=3, cutoff=self.fuzzy_cutoff)
+
+    def fuzzy_matches(self, tokens:list):
+        candidates = {}
+        for token in set(tokens):
+            similar = [token] if token in self.token_index else []
+            if not similar and len(token) >= 4:
+                similar = self.similar_tokens(token)
+            for similar_token in similar:
+                name_ids = self.token_index[similar_token]
+                if len(name_ids) > self.max_token_names:
+                    continue
+                for name_idx in name_ids:
+                    candidates[name_idx] = candidates.get(name_idx, 0) + 1
+        # names sharing the largest share of their tokens with the query are scored first
+        ranked = sorted((name_idx for name_idx, hits in candidates.items()
+                         if hits * 2 >= len(self.name_tokens[name_idx])),
+                        key=lambda name_idx: candidates[name_idx] / len(self.name_tokens[name_idx]), reverse=True)
+        found = []
+        for name_idx in ranked[:self.max_candidates]:
+            name_tokens = self.name_tokens[name_idx]
+            name_key = ' '.join(name_tokens)
+            width = len(name_tokens)
+            for start in range(max(1, len(tokens) - width + 1)):
+                window = ' '.join(tokens[start:start + width])
+                if difflib.SequenceMatcher(None, window, name_key).ratio() >= self.fuzzy_cutoff:
+                    found.append(name_idx)
+                    break
+        return found
+
+    def match(self, text:str):
+        tokens = normalize(text).split()
+        found = self.exact_matches(tokens)
+        if not found and self.fuzzy:
+            found = self.fuzzy_matches(tokens)
+        return [self.names[i] for i in dict.fromkeys(found)]
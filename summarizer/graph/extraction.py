@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_REQUESTS_PER_MINUTE = {"groq": 30, "openai": 500, "deepseek": 60}
+
+
+class TokenBucket:
+
+    def __init__(self, rate:float, capacity:float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # tokens may go negative: each caller reserves its slot and sleeps until it is due,
+        # which keeps the bucket usable from any thread or event loop
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+
+def rate_limiter(provider:str, requests_per_minute:float=None):
+    """Token bucket shared by every extraction run against the same provider."""
+    rpm = requests_per_minute or PROVIDER_REQUESTS_PER_MINUTE.get(provider, 60)
+    with rate_limiters_lock:
+        bucket = rate_limiters.get(provider)
+        if bucket is None or bucket.rate != rpm / 60:
+            bucket = TokenBucket(rpm / 60, max(1.0, rpm / 60 * 5))
+            rate_limiters[provider] = bucket
+        return bucket
+
+
+def chunk_key(document):
+    return hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()
+
+
+class ExtractionCheckpoint:
+    """JSONL file of chunks whose graph documents are already written to Neo4j."""
+
+    def __init__(self, path:str, run:dict):
+        self.path = path
+        self.run = run
+        self.completed = set()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self.completed
+        with open(self.path, 'r') as file:
+            lines = [json.loads(line) for line in file if line.strip()]
+        if lines and lines[0].get("run") == self.run:
+            self.completed = {line["chunk"] for line in lines[1:] if "chunk" in line}
+        return self.completed
+
+    def start(self):
+        if not self.completed:
+            with open(self.path, 'w') as file:
+                file.write(json.dumps({"run": self.run}) + "\n")
+
+    def mark(self, keys:list):
+        with open(self.path, 'a') as file:
+            file.write(''.join(json.dumps({"chunk": key}) + "\n" for key in keys))
+            file.flush()
+            os.fsync(file.fileno())
+        self.completed.update(keys)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class GraphExtractor:
+
+    def __init__(self, transformer, provider:str, max_concurrency:int=8,
+                 requests_per_minute:float=None, max_retries:int=5,
+                 backoff_base:float=1.0, backoff_max:float=60.0, batch_size:int=20,
+                 cache=None, cache_config:str=None):
+        self.transformer = transformer
+        self.cache = cache
+        self.cache_config = cache_config
+        self.limiter = rate_limiter(provider, requests_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+
+    def backoff(self, attempt:int):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def extract(self, document, semaphore):
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.limiter.acquire()
+                try:
+                    return await self.transformer.aprocess_response(document)
+                except Exception:
+                    if attempt == self.max_retries:
+                        raise
+                await asyncio.sleep(self.backoff(attempt))
+
+    async def run(self, documents:list, write, checkpoint:ExtractionCheckpoint, progress=None):
+        """Extract graph documents with bounded concurrency, passing them to write() in batches.
+
+        Chunks already recorded in the checkpoint are skipped. Each batch is
+        checkpointed only after write() returns, so a failed or interrupted
+        run can be resumed without losing or duplicating finished chunks.
+        """
+        progress = progress or (lambda stage, done=0, total=None: None)
+        completed = checkpoint.load()
+        checkpoint.start()
+        pending = [(chunk_key(doc), doc) for doc in documents]
+        pending = [(key, doc) for key, doc in pending if key not in completed]
+        total = len(documents)
+        done = total - len(pending)
+        cached = {}
+        if self.cache is not None:
+            # unchanged chunks are written from the extraction cache without calling the LLM
+            cached = await asyncio.to_thread(self.cache.get_many, self.cache_config, dict(pending))
+        progress("extracting", done, total)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def extract(key, doc):
+            graph_document = await self.extract(doc, semaphore)
+            if self.cache is not None:
+                self.cache.put(self.cache_config, key, graph_document)
+            return key, graph_document
+
+        tasks = [asyncio.create_task(extract(key, doc)) for key, doc in pending if key not in cached]
+        batch = []
+        write_failed = False
+
+        async def flush():
+            nonlocal write_failed
+            if batch:
+                try:
+                    await asyncio.to_thread(write, [graph_doc for _, graph_doc in batch])
+                except BaseException:
+                    # the batch may be partly written; it stays out of the checkpoint for the resumed run
+                    write_failed = True
+                    raise
+                checkpoint.mark([key for key, _ in batch])
+                batch.clear()
+
+        try:
+            for item in cached.items():
+                batch.append(item)
+                done += 1
+                if len(batch) >= self.batch_size:
+                    await flush()
+                progress("extracting", done, total)
+            for next_done in asyncio.as_completed(tasks):
+                batch.append(await next_done)
+                done += 1
+                if len(batch) >= self.batch_size:
+                    await flush()
+                progress("extracting", done, total)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not write_failed:
+                # keep what was extracted before a failed extraction or a cancellation
+                try:
+                    await flush()
+                except Exception as e:
+                    logger.warning("Could not write the extracted chunks before stopping: %s", e)
+            raise
+        await flush()
+        checkpoint.remove()
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from langchain_core.documents import Document
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+
+
+# bump when the extraction prompt or post-processing changes, so cached results are not reused
+EXTRACTION_PROMPT_VERSION = 1
+
+
+def extraction_config(model:str, allowed_nodes:list, allowed_relationships:list,
+                      prompt_version:int=EXTRACTION_PROMPT_VERSION):
+    config = {"model": model, "allowed_nodes": sorted(allowed_nodes),
+              "allowed_relationships": sorted(map(str, allowed_relationships)),
+              "prompt_version": prompt_version}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def dump_node(node:Node):
+    return {"id": node.id, "type": node.type, "properties": node.properties}
+
+
+def dump_graph_document(graph_document:GraphDocument):
+    return {
+        "source": {"page_content": graph_document.source.page_content,
+                   "metadata": graph_document.source.metadata},
+        "nodes": [dump_node(node) for node in graph_document.nodes],
+        "relationships": [{"source": dump_node(rel.source), "target": dump_node(rel.target),
+                           "type": rel.type, "properties": rel.properties}
+                          for rel in graph_document.relationships]
+    }
+
+
+def load_graph_document(data:dict, source:Document=None):
+    return GraphDocument(
+        nodes=[Node(**node) for node in data["nodes"]],
+        relationships=[Relationship(source=Node(**rel["source"]), target=Node(**rel["target"]),
+                                    type=rel["type"], properties=rel["properties"])
+                       for rel in data["relationships"]],
+        source=source or Document(**data["source"])
+    )
+
+
+class ExtractionCache:
+    """Graph documents extracted per chunk, keyed on (chunk hash, extraction config)."""
+
+    def __init__(self, path:str="./graph_extraction_cache.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS extractions "
+                                "(chunk TEXT NOT NULL, config TEXT NOT NULL, data TEXT NOT NULL, "
+                                "PRIMARY KEY (chunk, config))")
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, config:str, documents:dict):
+        """Return {chunk key: GraphDocument} for the cached entries among documents {chunk key: Document}."""
+        found = {}
+        keys = list(documents)
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT chunk, data FROM extractions WHERE config = ? AND chunk IN ({placeholders})",
+                    (config, *batch)).fetchall()
+                for key, data in rows:
+                    found[key] = load_graph_document(json.loads(data), documents[key])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, config:str, key:str, graph_document:GraphDocument):
+        with self._lock:
+            self.connection.execute("INSERT OR REPLACE INTO extractions (chunk, config, data) VALUES (?, ?, ?)",
+                                    (key, config, json.dumps(dump_graph_document(graph_document))))
+            self.connection.commit()
+
+    def count(self, config:str):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM extractions WHERE config = ?",
+                                           (config,)).fetchone()[0]
+
+    def iter_graph_documents(self, config:str, batch_size:int=500):
+        last = 0
+        while True:
+            with self._lock:
+                rows = self.connection.execute("SELECT rowid, data FROM extractions WHERE config = ? AND rowid > ? "
+                                               "ORDER BY rowid LIMIT ?", (config, last, batch_size)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [load_graph_document(json.loads(data)) for _, data in rows]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+import time
+from data_processing.loader import json_loader, json_dumper
+
+
+logger = logging.getLogger(__name__)
+
+NODE_QUERY = """
+MATCH (n)
+WHERE coalesce(n.id, n.name, n.ID) IS NOT NULL
+RETURN DISTINCT coalesce(n.id, n.name, n.ID) AS node_id, labels(n) AS labels
+"""
+
+
+class NodeIndex:
+    """Node ID -> labels, snapshotted to a JSON file shared by the processes on a host.
+
+    Once the mapping is older than `ttl`, it is rebuilt from Neo4j in a background
+    thread while get() keeps returning the current one, so no query waits for the
+    full node scan.
+    """
+
+    def __init__(self, driver, database:str=None,
+                 snapshot_file:str="./graph_id_label_map.json", ttl:float=3600, retry_delay:float=60):
+        self.driver = driver
+        self.database = database
+        self.snapshot_file = snapshot_file
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self.retry_at = 0.0
+        self.refreshing = None
+        self.mapping = None
+        self.version = 0
+        self.built_at = 0.0
+        self.generation = 0
+        self.dirty = False
+        self._snapshot_mtime = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def add_labels(mapping:dict, node_id, labels):
+        node_labels = mapping.setdefault(str(node_id), [])
+        for label in labels:
+            label = label.strip()
+            if label not in node_labels:
+                node_labels.append(label)
+
+    def fetch(self):
+        records, _, _ = self.driver.execute_query(NODE_QUERY, database_=self.database)
+        mapping = {}
+        for record in records:
+            self.add_labels(mapping, record["node_id"], record["labels"])
+        return mapping
+
+    def snapshot_mtime(self):
+        try:
+            return os.path.getmtime(self.snapshot_file)
+        except OSError:
+            return None
+
+    def load_snapshot(self):
+        data = json_loader(self.snapshot_file)
+        self.mapping = data["mapping"]
+        self.version = data.get("version", 0)
+        self.built_at = data.get("built_at", 0.0)
+        self.generation += 1
+        self._snapshot_mtime = self.snapshot_mtime()
+
+    def save_snapshot(self):
+        self.generation += 1
+        data = {"version": self.version, "built_at": self.built_at, "mapping": self.mapping}
+        tmp_file = f"{self.snapshot_file}.tmp"
+        json_dumper(data, tmp_file, indent=None)
+        os.replace(tmp_file, self.snapshot_file)
+        self.dirty = False
+        self._snapshot_mtime = self.snapshot_mtime()
+
+    def install(self, mapping:dict, version:int):
+        with self._lock:
+            if self.version != version and self.mapping is not None:
+                # nodes added by update() while the mapping was being fetched
+                for node_id, labels in self.mapping.items():
+                    self.add_labels(mapping, node_id, labels)
+            self.mapping = mapping
+            self.version += 1
+            self.built_at = time.time()
+            self.save_snapshot()
+
+    def rebuild(self):
+        with self._lock:
+            self.install(self.fetch(), self.version)
+
+    def refresh(self):
+        try:
+            version = self.version
+            self.install(self.fetch(), version)
+        except Exception as e:
+            logger.warning("Node index refresh failed, serving the previous mapping: %s", e)
+            self.retry_at = time.time() + self.retry_delay
+        finally:
+            self.refreshing = None
+
+    def start_refresh(self):
+        if self.refreshing is None and time.time() >= self.retry_at:
+            self.refreshing = threading.Thread(target=self.refresh, name="node-index-refresh", daemon=True)
+            self.refreshing.start()
+
+    def get(self):
+        with self._lock:
+            mtime = self.snapshot_mtime()
+            if self.mapping is None and mtime is None:
+                self.rebuild()
+            elif mtime is not None and mtime != self._snapshot_mtime and not self.dirty:
+                # written by another process, e.g. generate_graph.py
+                self.load_snapshot()
+            if self.ttl and time.time() - self.built_at > self.ttl:
+                self.start_refresh()
+            return self.mapping
+
+    def update(self, graph_documents:list):
+        """Add written nodes in memory; flush() snapshots them once, at the end of an ingestion run."""
+        with self._lock:
+            mapping = self.get()
+            for graph_document in graph_documents:
+                for node in graph_document.nodes:
+                    self.add_labels(mapping, node.id, [node.type])
+            self.version += 1
+            self.dirty = True
+
+    def flush(self):
+        with self._lock:
+            if self.dirty:
+                self.save_snapshot()
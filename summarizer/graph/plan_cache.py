@@ -0,0 +1,118 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from graph.entity_matcher import normalize
+
+
+STRING_LITERAL = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+CASINGS = {"exact": lambda text: text, "lower": str.lower, "upper": str.upper}
+
+
+class CypherPlan:
+
+    def __init__(self, cypher:str, slots:dict):
+        self.cypher = cypher
+        # parameter name -> (entity position in the question, casing applied to it)
+        self.slots = slots
+        self.created = time.time()
+        self.hits = 0
+
+    def params(self, entities:list):
+        return {name: CASINGS[casing](entities[position]) for name, (position, casing) in self.slots.items()}
+
+
+class CypherPlanCache:
+    """Validated Cypher statements keyed by question shape.
+
+    Entity names matched in the question are replaced by placeholders in the
+    key, and by parameters in the stored Cypher, so one plan answers the same
+    question about any entity with the same labels.
+    """
+
+    def __init__(self, max_entries:int=512, ttl:float=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def shape(question:str, entities:dict, scope=()):
+        """Return (key, entity names in question order) or (None, []) if the question cannot be templated."""
+        text = f" {normalize(question)} "
+        found = []
+        for name in entities:
+            position = text.find(f" {normalize(name)} ")
+            if position < 0 or not normalize(name):
+                # fuzzy matches have no exact span to replace
+                return None, []
+            found.append((position, name))
+        found.sort()
+        names = [name for _, name in found]
+        for i, name in enumerate(names):
+            text = text.replace(f" {normalize(name)} ", f" {{e{i}}} ")
+        labels = tuple(tuple(sorted(entities[name])) for name in names)
+        return (' '.join(text.split()), labels, scope), names
+
+    @staticmethod
+    def parameterize(cypher:str, names:list):
+        """Replace string literals naming matched entities with $e<i> parameters."""
+        slots = {}
+
+        def replace(match):
+            literal = match.group(1) if match.group(1) is not None else match.group(2)
+            for i, name in enumerate(names):
+                for casing, apply in CASINGS.items():
+                    if literal == apply(name):
+                        slots[f"e{i}"] = (i, casing)
+                        return f"$e{i}"
+            return match.group(0)
+
+        templated = STRING_LITERAL.sub(replace, cypher)
+        if len({position for position, _ in slots.values()}) != len(names):
+            # an entity is referenced some other way (e.g. a substring), so the plan is not reusable
+            return None
+        return CypherPlan(templated, slots)
+
+    def get(self, key):
+        with self._lock:
+            plan = self.plans.get(key)
+            if plan is not None and self.ttl and time.time() - plan.created > self.ttl:
+                del self.plans[key]
+                plan = None
+            if plan is None:
+                self.misses += 1
+                return None
+            self.plans.move_to_end(key)
+            plan.hits += 1
+            self.hits += 1
+            return plan
+
+    def put(self, key, cypher:str, names:list):
+        plan = self.parameterize(cypher, names)
+        if plan is None:
+            return None
+        with self._lock:
+            self.plans[key] = plan
+            self.plans.move_to_end(key)
+            while len(self.plans) > self.max_entries:
+                self.plans.popitem(last=False)
+        return plan
+
+    def evict(self, key):
+        with self._lock:
+            if self.plans.pop(key, None) is not None:
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.plans = OrderedDict()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"plans": len(self.plans), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
@@ -1,16 +1,23 @@
-from langchain_experimental.graph_transformers import LLMGraphTransformer
+import asyncio
+import threading
 from langchain_neo4j import Neo4jGraph
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
-from langchain_deepseek import ChatDeepSeek
-from neo4j import GraphDatabase
 from tqdm import tqdm
+from data_processing.loader import PdfFiles
 from llm.embedding import Documents
+from llm.providers import chat_model_class
+from graph.extraction import ExtractionCheckpoint, GraphExtractor
+from graph.extraction_cache import ExtractionCache, extraction_config
+from graph.node_index import NodeIndex
+from graph.schema_cache import SchemaCache
 from graph.token_match import TokenMatch
+from graph.writer import GraphWriter
+from llm.tracing import llm_usage, span
 
 
 class Graph:
     graph_id_label_map_file = "./graph_id_label_map.json"
+    checkpoint_file = "./graph_checkpoint.jsonl"
+    extraction_cache_file = "./graph_extraction_cache.sqlite"
 
     def __init__(self, url, username, password, api_key,
                  allowed_nodes:list=None, allowed_relationships:list=None,
@@ -20,21 +27,37 @@ class Graph:
         self.password = password
         self.allowed_nodes = allowed_nodes or []
         self.allowed_relationships = allowed_relationships or []
+        self.llm_model = llm_model
+        self.llm_api = llm_api
         self.em = TokenMatch()
         self.graph = Neo4jGraph(
             url=url,
             username=username,
             password=password
         )
-        llms = {"openai": ChatOpenAI, "groq": ChatGroq, "deepseek": ChatDeepSeek}
-        self.llm = llms.get(llm_api)(
+        self.node_index = NodeIndex(self.graph._driver, self.graph._database,
+                                    self.graph_id_label_map_file)
+        self.writer = GraphWriter(self.graph._driver, self.graph._database)
+        self.schema_cache = SchemaCache()
+        self.schema_lock = threading.Lock()
+        self.cache_stats = None
+        self.llm = chat_model_class(llm_api)(
             api_key=api_key,
             model_name=llm_model,
-            temperature=1
+            temperature=1,
+            callbacks=[llm_usage]
         )
-        self.llm_transformer = LLMGraphTransformer(llm=self.llm,
-                                                   allowed_nodes=self.allowed_nodes,
-                                                   allowed_relationships=self.allowed_relationships)
+        self._llm_transformer = None
+
+    @property
+    def llm_transformer(self):
+        # only graph generation needs it, so query-serving processes skip importing langchain_experimental
+        if self._llm_transformer is None:
+            from langchain_experimental.graph_transformers import LLMGraphTransformer
+            self._llm_transformer = LLMGraphTransformer(llm=self.llm,
+                                                        allowed_nodes=self.allowed_nodes,
+                                                        allowed_relationships=self.allowed_relationships)
+        return self._llm_transformer
 
     @staticmethod
     def combine_filename_document(filename, document):
@@ -42,9 +65,15 @@ class Graph:
         return txt
 
     async def prepare_graph(self, split_pagewise=False,
-                            chunk_size:int=1000, chunk_overlap:int=200):
+                            chunk_size:int=1000, chunk_overlap:int=200, progress=None,
+                            max_concurrency:int=8, requests_per_minute:float=None,
+                            max_retries:int=5, batch_size:int=20, use_cache:bool=True,
+                            write_batch_size:int=1000):
+        progress = progress or (lambda stage, done=0, total=None: None)
         self.graph_documents = []
-        doc = Documents(chunk_size, chunk_overlap)
+        self.writer.batch_size = write_batch_size
+        progress("loading")
+        doc = Documents(chunk_size, chunk_overlap, PdfFiles.list_pdfs())
         if split_pagewise:
             doc.prepare_splitted_document_chunks_pagewise()
         else:
@@ -52,51 +81,123 @@ class Graph:
         for document in tqdm(doc.chunked_docs):
             filename = document.metadata.get('source')
             document.page_content = self.combine_filename_document(filename, document.page_content)
-        graph_doc = await self.llm_transformer.aconvert_to_graph_documents(doc.chunked_docs)
-        self.graph.add_graph_documents(graph_doc)
-        self.graph_documents.append(graph_doc)
-
-    def get_id_label_mapping_from_db(self):
-        auth = (self.username, self.password)
-        driver = GraphDatabase.driver(self.url, auth=auth)
-        query = """
-        MATCH (n)
-        WHERE coalesce(n.id, n.name, n.ID) IS NOT NULL
-        RETURN DISTINCT coalesce(n.id, n.name, n.ID) AS node_id, labels(n) AS labels
+        cache = ExtractionCache(self.extraction_cache_file) if use_cache else None
+        extractor = GraphExtractor(self.llm_transformer, self.llm_api, max_concurrency,
+                                   requests_per_minute, max_retries, batch_size=batch_size,
+                                   cache=cache, cache_config=self.extraction_config)
+        checkpoint = ExtractionCheckpoint(self.checkpoint_file, {
+            "model": self.llm_model, "allowed_nodes": self.allowed_nodes,
+            "allowed_relationships": self.allowed_relationships, "page_wise": split_pagewise,
+            "chunk_size": chunk_size, "chunk_overlap": chunk_overlap
+        })
+        try:
+            await extractor.run(doc.chunked_docs, self.write_graph_documents, checkpoint, progress)
+        finally:
+            # one snapshot per run, so serving processes reload the index and schema once
+            self.node_index.flush()
+            if cache is not None:
+                self.cache_stats = {"hits": cache.hits, "misses": cache.misses}
+                cache.close()
+        self.graph.refresh_schema()
+
+    @property
+    def extraction_config(self):
+        return extraction_config(self.llm_model, self.allowed_nodes, self.allowed_relationships)
+
+    def rebuild_from_cache(self, batch_size:int=500, progress=None, write_batch_size:int=1000):
+        """Write every cached extraction for this model and type filter to Neo4j, without calling the LLM."""
+        progress = progress or (lambda stage, done=0, total=None: None)
+        self.graph_documents = []
+        self.writer.batch_size = write_batch_size
+        cache = ExtractionCache(self.extraction_cache_file)
+        try:
+            total = cache.count(self.extraction_config)
+            done = 0
+            progress("writing", done, total)
+            for graph_documents in cache.iter_graph_documents(self.extraction_config, batch_size):
+                self.write_graph_documents(graph_documents)
+                done += len(graph_documents)
+                progress("writing", done, total)
+        finally:
+            self.node_index.flush()
+            cache.close()
+        self.graph.refresh_schema()
+
+    def write_graph_documents(self, graph_documents:list):
+        self.writer.write(graph_documents)
+        self.node_index.update(graph_documents)
+        self.graph_documents.append(graph_documents)
+
+    def close(self):
+        self.graph._driver.close()
+
+    @property
+    def schema_key(self):
+        return (tuple(self.allowed_nodes), tuple(map(str, self.allowed_relationships)))
+
+    def check_schema_version(self):
+        """Refresh the Neo4j schema once per node index generation instead of on every query.
+
+        The generation moves when this process writes the graph or picks up a
+        snapshot written by an ingestion run elsewhere.
         """
-        mapping = []
-        with driver.session() as session:
-            results = session.run(query)
-            for record in results:
-                mapping.append({
-                    "id": record["node_id"],
-                    "labels": record["labels"]
-                })
-        return mapping
-
-    def get_id_label_mapping(self, text:str):
-        id_label_mapping = self.get_id_label_mapping_from_db()
-        mapping = {}
-        for i in id_label_mapping:
-            ids = i.get('id')
-            labels = i.get('labels')
-            if ids not in mapping:
-                mapping[ids] = [label.strip() for label in labels]
-            else:
-                mapping[ids] += [label.strip() for label in labels]
+        with self.schema_lock:
+            version = self.node_index.generation
+            if version == self.schema_cache.version:
+                return False
+            first = self.schema_cache.version is None
+            self.schema_cache.reset(version)
+            if not first:
+                # the schema read when the graph was opened is still current on first use
+                self.graph.refresh_schema()
+                self.on_schema_change()
+            return not first
+
+    def on_schema_change(self):
+        pass
+
+    def allowed_mapping(self, mapping:dict):
         if len(self.allowed_nodes) > 0:
             mapping = {i:j for i,j in mapping.items() if any([node in j for node in self.allowed_nodes])}
-        nodes_required = self.em.extract(text, list(mapping.keys()))
-        nodes_required = [i.lower().strip() for i in nodes_required]
-        mapping = {i:j for i,j in mapping.items() if i.lower() in nodes_required}
+        by_lower = {}
+        for name in mapping:
+            by_lower.setdefault(name.lower(), []).append(name)
+        return mapping, list(mapping.keys()), by_lower
+
+    async def match_entities(self, text:str, llm_fallback:bool=None):
+        """Return {node id: labels} for the graph nodes mentioned in text."""
+        with span("node_index"):
+            full_mapping = await asyncio.to_thread(self.node_index.get)
+        if self.node_index.generation != self.schema_cache.version:
+            with span("schema"):
+                await asyncio.to_thread(self.check_schema_version)
+        mapping, names, by_lower = self.schema_cache.get(("mapping", self.schema_key),
+                                                         lambda: self.allowed_mapping(full_mapping))
+        matcher_key = (self.node_index.generation, tuple(self.allowed_nodes))
+        with span("token_match"):
+            nodes_required = await self.em.extract(text, names, matcher_key, llm_fallback)
+        nodes_required = dict.fromkeys(i.lower().strip() for i in nodes_required)
+        return {name: mapping[name] for i in nodes_required for name in by_lower.get(i, [])}
+
+    @staticmethod
+    def format_mapping(mapping:dict):
         mappings_edited = ""
         for key, value in mapping.items():
             for val in value:
                 mappings_edited += f'{key.strip()} → ({val.strip()} {{name: "{key.strip()}"}})\n'
         mappings_edited = mappings_edited.strip()
         return mappings_edited
-    
+
+    async def get_id_label_mapping(self, text:str):
+        return self.format_mapping(await self.match_entities(text))
+
     def get_relationships(self):
+        with span("schema"):
+            if self.node_index.generation != self.schema_cache.version:
+                self.check_schema_version()
+            return self.schema_cache.get(("relationships", self.schema_key), self.build_relationships)
+
+    def build_relationships(self):
         relationships = [f"(:{rel['start']})-[:{rel['type']}]->(:{rel['end']})" for rel in self.graph.get_structured_schema['relationships']]
         if len(self.allowed_nodes) > 0:
             relationships = [i for i in relationships if any([node.strip() in i.strip() for node in self.allowed_nodes])]
@@ -0,0 +1,27 @@
+import threading
+
+
+class SchemaCache:
+    """Prompt-ready schema text keyed by type filters, dropped whenever the graph version changes."""
+
+    def __init__(self):
+        self.version = None
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+    def reset(self, version):
+        with self._lock:
+            self.version = version
+            self.entries = {}
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            value = build()
+            self.entries[key] = value
+            return value
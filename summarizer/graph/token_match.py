@@ -1,22 +1,61 @@
 import ast
+import asyncio
 import os
+import threading
 from llm.base_llm import LLM
+from graph.entity_matcher import EntityMatcher
 # from dotenv import load_dotenv
 # load_dotenv()
 
 
 class TokenMatch:
 
-    def __init__(self):
-        prompt = """
+    def __init__(self, use_llm_fallback:bool=None, fuzzy:bool=None):
+        if use_llm_fallback is None:
+            use_llm_fallback = os.getenv("TOKEN_MATCH_LLM_FALLBACK", "false").lower() == "true"
+        if fuzzy is None:
+            fuzzy = os.getenv("TOKEN_MATCH_FUZZY", "false").lower() == "true"
+        self.use_llm_fallback = use_llm_fallback
+        self.fuzzy = fuzzy
+        self.matcher = None
+        self.matcher_key = None
+        self._matcher_lock = threading.Lock()
+        self._extractor_llm = None
+
+    @property
+    def extractor_llm(self):
+        if self._extractor_llm is None:
+            prompt = """
 You are a language expert.
 From the given text, extract all and any possible matching keywords present in the provided keywords list and return in a python list and nothing else.
 """
-        api = os.getenv("GROQ_API_KEY")
-        self.extractor_llm = LLM("llama-3.3-70b-versatile", api, prompt)
+            api = os.getenv("GROQ_API_KEY")
+            self._extractor_llm = LLM("llama-3.3-70b-versatile", api, prompt)
+            self._extractor_llm.stage = "token_match_llm"
+        return self._extractor_llm
+
+    def get_matcher(self, keywords:list, key=None):
+        # concurrent queries after a generation change wait for one rebuild instead of each building their own
+        with self._matcher_lock:
+            if self.matcher is None or key is None or key != self.matcher_key:
+                self.matcher = EntityMatcher(keywords, self.fuzzy)
+                self.matcher_key = key
+            return self.matcher
+
+    def match(self, txt:str, keywords:list, key=None):
+        return self.get_matcher(keywords, key).match(txt)
+
+    async def extract(self, txt:str, keywords:list, key=None, llm_fallback:bool=None):
+        # building the automaton and fuzzy scoring are CPU-bound, so they stay off the event loop
+        response = await asyncio.to_thread(self.match, txt, keywords, key)
+        if llm_fallback is None:
+            llm_fallback = self.use_llm_fallback
+        if not response and llm_fallback:
+            response = await self.extract_with_llm(txt, keywords)
+        return response
 
-    def extract(self, txt:str, *keywords:str):
+    async def extract_with_llm(self, txt:str, *keywords:str):
         prompt = f"text: {txt}\nkeywords:{keywords}"
-        response = self.extractor_llm.query_llm(prompt)
+        response = await self.extractor_llm.query_llm(prompt)
         response = ast.literal_eval(response)
-        return response
\ No newline at end of file
+        return response
@@ -0,0 +1,104 @@
+import argparse
+import json
+import time
+import faiss
+import numpy as np
+from llm.embedding import VectorStore
+
+
+parser = argparse.ArgumentParser(
+        description="Compare recall and latency of FAISS index types against the flat index"
+    )
+parser.add_argument("--index-types", nargs='+', default=["ivf_flat", "ivf_pq", "hnsw"],
+                    choices=VectorStore.index_types, help="Index types to evaluate.")
+parser.add_argument("--queries-file", default=None,
+                    help="Text file with one query per line. Defaults to sampled chunks.")
+parser.add_argument("--num-queries", type=int, default=200,
+                    help="Number of chunks sampled as queries when no queries file is given.")
+parser.add_argument("--k", type=int, default=10, help="Neighbours compared for recall@k.")
+parser.add_argument("--nlist", type=int, default=1024)
+parser.add_argument("--nprobe", type=int, nargs='+', default=[1, 8, 16, 64])
+parser.add_argument("--pq-m", type=int, default=16)
+parser.add_argument("--hnsw-m", type=int, default=32)
+parser.add_argument("--ef-search", type=int, nargs='+', default=[16, 64, 256])
+parser.add_argument("--output", default=None, help="Write the JSON report to this file.")
+
+args = parser.parse_args()
+
+
+def stored_vectors(vs:VectorStore):
+    store = vs.vector_store
+    if isinstance(store.index, faiss.IndexFlat):
+        return store.index.reconstruct_n(0, store.index.ntotal)
+    texts = [store.docstore.search(store.index_to_docstore_id[i]).page_content
+             for i in range(store.index.ntotal)]
+    return np.asarray(vs.embeddings.embed_documents(texts), dtype="float32")
+
+
+def query_vectors(vs:VectorStore, vectors):
+    if args.queries_file:
+        with open(args.queries_file, 'r') as file:
+            queries = [line.strip() for line in file if line.strip()]
+        return np.asarray(vs.embeddings.embed_documents(queries), dtype="float32")
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(vectors), size=min(args.num_queries, len(vectors)), replace=False)
+    return vectors[sample]
+
+
+def evaluate(index, queries, ground_truth):
+    latencies = []
+    hits = 0
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(ids[0]) & set(ground_truth[i]))
+    return {
+        f"recall@{args.k}": round(hits / (len(queries) * args.k), 4),
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 4),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 4)
+    }
+
+
+def main():
+    vs = VectorStore()
+    vs.load()
+    vectors = stored_vectors(vs)
+    queries = query_vectors(vs, vectors)
+    dim = vectors.shape[1]
+
+    flat = faiss.IndexFlatL2(dim)
+    flat.add(vectors)
+    _, ground_truth = flat.search(queries, args.k)
+    report = {"vectors": len(vectors), "queries": len(queries), "k": args.k,
+              "results": [{"index_type": "flat", "build_s": 0.0,
+                           "size_bytes": len(faiss.serialize_index(flat)),
+                           **evaluate(flat, queries, ground_truth)}]}
+
+    for index_type in args.index_types:
+        candidate = VectorStore(index_type=index_type, nlist=args.nlist, nprobe=args.nprobe[0],
+                                pq_m=args.pq_m, hnsw_m=args.hnsw_m, ef_search=args.ef_search[0],
+                                embeddings=vs.embeddings)
+        start = time.perf_counter()
+        index = candidate.build_index(dim, vectors)
+        index.add(vectors)
+        build_s = round(time.perf_counter() - start, 4)
+        size_bytes = len(faiss.serialize_index(index))
+        knobs = {"flat": [None], "hnsw": args.ef_search}.get(candidate.built_index_type, args.nprobe)
+        for knob in knobs:
+            if knob is not None:
+                candidate.nprobe = candidate.ef_search = knob
+                candidate.apply_search_params(index)
+            report["results"].append({"index_type": candidate.built_index_type,
+                                      "search_param": knob, "build_s": build_s,
+                                      "size_bytes": size_bytes,
+                                      **evaluate(index, queries, ground_truth)})
+
+    print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+
+    def __init__(self, kind:str, params:dict=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = "queued"
+        self.stage = None
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+
+    def progress(self, stage:str, done:int=0, total:int=None):
+        # called by the job body; doubles as the cancellation point
+        self.check_cancelled()
+        self.stage = stage
+        self.done = done
+        self.total = total
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": {"stage": self.stage, "done": self.done, "total": self.total},
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+
+
+class JobManager:
+
+    def __init__(self, max_workers:int=2, max_finished:int=100, store_locks:dict=None):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="job")
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.store_locks = dict(store_locks or {})
+        self._lock = threading.Lock()
+
+    def store_lock(self, store:str):
+        with self._lock:
+            return self.store_locks.setdefault(store, threading.Lock())
+
+    def submit(self, kind:str, store:str, fn, params:dict=None):
+        """Queue fn(job) on the worker pool; jobs writing the same store run one at a time."""
+        job = Job(kind, params)
+        with self._lock:
+            self.jobs[job.id] = job
+            self.prune()
+        self.executor.submit(self.run, job, self.store_lock(store), fn)
+        return job
+
+    def run(self, job:Job, lock, fn):
+        with lock:
+            if job.cancel_event.is_set():
+                job.status = "cancelled"
+                job.finished = time.time()
+                return
+            job.status = "running"
+            job.started = time.time()
+            try:
+                job.result = fn(job)
+                job.status = "succeeded"
+            except JobCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+            finally:
+                job.finished = time.time()
+
+    def prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id:str):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [job.to_dict() for job in list(self.jobs.values())]
+
+    def cancel(self, job_id:str):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.finished is None:
+            job.cancel_event.set()
+        return job
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            job.cancel_event.set()
+        self.executor.shutdown(wait=True, cancel_futures=False)
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import random
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """Startup steps run in order off the event loop; failed steps are retried with backoff.
+
+    A failed step does not stop the remaining ones, so e.g. an unreachable Neo4j
+    does not keep the embedding model from loading, and readiness can be
+    reported for a subset of the steps. After the first pass, failed steps are
+    retried with exponential backoff until all of them succeeded.
+    """
+
+    def __init__(self, steps:list, retry_delay:float=1.0, max_retry_delay:float=60.0):
+        self.steps = steps
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.stage = None
+        self.timings = {}
+        self.errors = {}
+        self.attempts = {}
+        self.succeeded = set()
+        self.started = None
+        self.finished = None
+        self.task = None
+        # set after a step's first attempt, whether it succeeded or not
+        self.attempted = {name: asyncio.Event() for name, _ in steps}
+
+    @property
+    def ready(self):
+        return self.ready_for()
+
+    def ready_for(self, names:tuple=None):
+        return all(name in self.succeeded for name in names or self.attempted)
+
+    async def attempt(self, name:str, step):
+        self.stage = name
+        self.attempts[name] = self.attempts.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(step)
+            self.succeeded.add(name)
+            self.errors.pop(name, None)
+        except Exception as e:
+            self.errors[name] = f"{type(e).__name__}: {e}"
+            logger.warning("Warm-up step %s failed (attempt %d): %s", name, self.attempts[name], self.errors[name])
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 3)
+            self.stage = None
+            self.attempted[name].set()
+
+    async def run(self):
+        self.started = time.time()
+        for name, step in self.steps:
+            await self.attempt(name, step)
+        delay = self.retry_delay
+        while self.errors:
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, self.max_retry_delay)
+            for name, step in self.steps:
+                if name not in self.succeeded:
+                    await self.attempt(name, step)
+        self.finished = time.time()
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def wait(self, *names:str):
+        """Wait for the first attempt of the named steps (all by default); retries are not awaited."""
+        for name in names or self.attempted:
+            await self.attempted[name].wait()
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def status(self, names:tuple=None):
+        names = tuple(names or self.attempted)
+        if self.ready_for(names):
+            status = "ready"
+        elif all(self.attempted[name].is_set() for name in names):
+            status = "error"
+        else:
+            status = "starting"
+        steps = {name: "ready" if name in self.succeeded else "error" if name in self.errors else "pending"
+                 for name in self.attempted}
+        return {"status": status, "stage": self.stage, "steps": steps, "timings": self.timings,
+                "errors": self.errors, "attempts": self.attempts,
+                "seconds": round((self.finished or time.time()) - self.started, 3) if self.started else None}
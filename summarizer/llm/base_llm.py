@@ -1,63 +1,98 @@
+import asyncio
 import datetime
-import requests
+from llm.client import ChatClient, chat_client
 from llm.embedding import VectorStore
+from llm.session_store import SessionStore
+from llm.tracing import span
+
+
+SUMMARY_PROMPT = """Condense the conversation below into a short summary that keeps the facts, names,
+figures and open questions a follow-up question might refer to. Reply with the summary only."""
 
 
 class LLM:
+    # tracing stage of the answer call
+    stage = "llm"
 
     def __init__(self, model_name:str, GROQ_API_KEY:str, system_prompt:str,
-                 vector_store:VectorStore=None, history_tracking=False):
+                 vector_store:VectorStore=None, history_tracking=False,
+                 client:ChatClient=None, sessions:SessionStore=None):
         self.model_name = model_name
         self.__vector_store = vector_store
         self.system_prompt = system_prompt
+        # without a session ID, tracked history goes to one bounded shared session
         self.history_tracking = history_tracking
         self.temperature = 0.3
-        self.first_call = True
         if not GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY is not set")
         self.__api_key = GROQ_API_KEY
-        self.chat_history = []
+        self.client = client or chat_client
+        self.sessions = sessions or SessionStore()
 
     def build_prompt(self, user_input, context, formatted_chat_history):
         today_date = str(datetime.datetime.now().strftime('%B %d, %Y'))
-        if self.first_call or not (not self.first_call and self.history_tracking):
-            system_prompt = self.system_prompt + '\n'
-        else:
-            system_prompt = ""
-        self.first_system_prompt = system_prompt
-
+        system_prompt = self.system_prompt + '\n'
         system_prompt += f"Today's date: {today_date}\nUse the following context to answer queries:\n{context}" if self.__vector_store else ""
 
         messages = [{"role": "system", "content": system_prompt}]
         messages.append({"role": "user", "content": f"chat history: {formatted_chat_history}\n\nuser input: {user_input}"})
         return messages
 
-    def query_llm(self, user_input):
-        url = "https://api.groq.com/openai/v1/chat/completions"
-
-        formatted_chat_history = '\n\n'.join(self.chat_history) if self.history_tracking else ''
+    async def retrieve_context(self, user_input, retrieval:dict=None):
         if isinstance(self.__vector_store, VectorStore):
-            context = "\n".join(self.__vector_store.similarity_search(user_input))
-        else:
-            context = ""
+            return "\n".join(await asyncio.to_thread(self.__vector_store.similarity_search, user_input,
+                                                      **(retrieval or {})))
+        return ""
+
+    def session(self, session_id:str=None):
+        return session_id or ("default" if self.history_tracking else None)
+
+    async def build_payload(self, user_input, context:str=None, session_id:str=None, retrieval:dict=None):
+        session_id = self.session(session_id)
+        if context is None:
+            context = await self.retrieve_context(user_input, retrieval)
+        formatted_chat_history = await self.sessions.history(session_id) if session_id else ''
         messages = self.build_prompt(user_input, context, formatted_chat_history)
-        headers = {
-            "Authorization": f"Bearer {self.__api_key}",
-            "Content-Type": "application/json"
-        }       
         payload = {
             "model": self.model_name,
             "messages": messages,
             "temperature": self.temperature,
             # "max_tokens": 800          
         }
-        response = requests.post(url, headers=headers, json=payload)
-        output = response.json()['choices'][0]['message']['content'].strip()
-        self.first_call = False
-        if self.history_tracking:
-            self.chat_history.append(f"query: {self.first_system_prompt}{user_input}\nresponse: {output}")
+        return payload
+
+    async def summarize(self, summary:str, turns:str):
+        content = f"summary so far: {summary}\n\nconversation:\n{turns}" if summary else turns
+        payload = {"model": self.model_name, "temperature": 0,
+                   "messages": [{"role": "system", "content": SUMMARY_PROMPT},
+                                {"role": "user", "content": content}]}
+        with span("session_summary"):
+            return await self.client.complete(self.__api_key, payload)
+
+    async def record(self, user_input, output, session_id:str=None):
+        session_id = self.session(session_id)
+        if session_id:
+            await self.sessions.record(session_id, user_input, output, self.summarize)
+
+    async def query_llm(self, user_input, context:str=None, session_id:str=None, record_as:str=None,
+                        retrieval:dict=None):
+        """Answer user_input; the turn is remembered in the session as record_as (default user_input)."""
+        payload = await self.build_payload(user_input, context, session_id, retrieval)
+        with span(self.stage):
+            output = await self.client.complete(self.__api_key, payload)
+        await self.record(record_as or user_input, output, session_id)
         return output
-    
+
+    async def stream_llm(self, user_input, context:str=None, session_id:str=None, record_as:str=None,
+                         retrieval:dict=None):
+        """Yield the answer token by token; history is only recorded for completed answers."""
+        payload = await self.build_payload(user_input, context, session_id, retrieval)
+        tokens = []
+        with span(self.stage):
+            async for token in self.client.stream(self.__api_key, payload):
+                tokens.append(token)
+                yield token
+        await self.record(record_as or user_input, ''.join(tokens).strip(), session_id)
 
 
 
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import random
+import httpx
+from llm.tracing import payload_chars, record_llm_call, usage_tokens
+
+
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class ChatClient:
+
+    path = "/openai/v1/chat/completions"
+
+    def __init__(self, base_url:str=None, max_connections:int=200, max_keepalive_connections:int=50,
+                 keepalive_expiry:float=30.0, max_concurrency:int=100,
+                 timeout:float=60.0, connect_timeout:float=5.0,
+                 max_retries:int=4, backoff_base:float=0.5, backoff_max:float=10.0):
+        self.base_url = (base_url or os.getenv("GROQ_API_BASE") or "https://api.groq.com").rstrip('/')
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+
+    def _bind_loop(self):
+        # httpx connections and asyncio primitives belong to the loop that created them,
+        # so scripts calling asyncio.run() repeatedly get a fresh pool each time.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._client is None or self._client.is_closed:
+            self._loop = loop
+            self._client = httpx.AsyncClient(base_url=self.base_url, http2=True,
+                                             limits=self.limits, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    @property
+    def client(self):
+        self._bind_loop()
+        return self._client
+
+    @property
+    def semaphore(self):
+        self._bind_loop()
+        return self._semaphore
+
+    def backoff(self, attempt:int, retry_after:str=None):
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def post(self, api_key:str, payload:dict):
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                async with self.semaphore:
+                    response = await self.client.post(self.path, headers=headers, json=payload)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                await asyncio.sleep(self.backoff(attempt, response.headers.get("retry-after")))
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    async def stream(self, api_key:str, payload:dict):
+        """Yield content deltas of a streamed completion.
+
+        Retries only happen before the first token; closing the generator
+        (e.g. when the HTTP client disconnects) aborts the upstream request.
+        """
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        payload = {**payload, "stream": True}
+        streamed = False
+        usage = None
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                async with self.semaphore:
+                    async with self.client.stream("POST", self.path, headers=headers, json=payload) as response:
+                        if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                            retry_after = response.headers.get("retry-after")
+                        else:
+                            if response.status_code >= 400:
+                                await response.aread()
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    break
+                                data = json.loads(data)
+                                usage = data.get("usage") or (data.get("x_groq") or {}).get("usage") or usage
+                                choices = data.get("choices") or [{}]
+                                content = choices[0].get("delta", {}).get("content")
+                                if content:
+                                    streamed = True
+                                    yield content
+                            record_llm_call(payload.get("model"), payload_chars(payload), *usage_tokens(usage))
+                            return
+            except httpx.TransportError:
+                if last_attempt or streamed:
+                    raise
+                retry_after = None
+            await asyncio.sleep(self.backoff(attempt, retry_after))
+
+    async def complete(self, api_key:str, payload:dict):
+        output = await self.post(api_key, payload)
+        record_llm_call(payload.get("model"), payload_chars(payload), *usage_tokens(output.get("usage")))
+        return output['choices'][0]['message']['content'].strip()
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+chat_client = ChatClient()
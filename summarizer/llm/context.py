@@ -0,0 +1,105 @@
+import numpy as np
+from llm.session_store import estimate_tokens
+
+
+class ContextAssembler:
+    """Turns retrieved chunks into the context sent to the LLM.
+
+    `fetch_k` candidates are diversified down to `k` with maximal marginal
+    relevance, chunks overlapping within the same source are merged back into
+    one passage using their `start_index`, and passages are packed in relevance
+    order until `context_tokens` is reached.
+    """
+
+    def __init__(self, k:int=4, fetch_k:int=20, lambda_mult:float=0.5, context_tokens:int=1500):
+        self.k = k
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.context_tokens = context_tokens
+
+    def options(self, k:int=None, fetch_k:int=None, lambda_mult:float=None, context_tokens:int=None):
+        k = k or self.k
+        return {"k": k, "fetch_k": max(k, fetch_k or self.fetch_k),
+                "lambda_mult": self.lambda_mult if lambda_mult is None else lambda_mult,
+                "context_tokens": context_tokens or self.context_tokens}
+
+    @staticmethod
+    def mmr(query_vector, vectors, k:int, lambda_mult:float, relevance=None):
+        """Indices of k rows of vectors, picked greedily by relevance minus redundancy (cosine).
+
+        relevance defaults to the cosine similarity to query_vector; rank-fused
+        candidates pass their fused scores instead.
+        """
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if relevance is None:
+            query_vector = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+            relevance = vectors @ query_vector
+        else:
+            relevance = np.asarray(relevance, dtype="float32")
+            relevance = relevance / max(float(relevance.max()), 1e-12)
+        similarity = vectors @ vectors.T
+        selected = [int(np.argmax(relevance))]
+        redundancy = similarity[selected[0]].copy()
+        for _ in range(min(k, len(vectors)) - 1):
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+            scores[selected] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            redundancy = np.maximum(redundancy, similarity[best])
+        return selected
+
+    @staticmethod
+    def merge(documents:list):
+        """Merge overlapping chunks of the same source; documents are in relevance order.
+
+        Returns passage texts, each ranked by its most relevant chunk.
+        """
+        groups = {}
+        passages = []
+        for rank, doc in enumerate(documents):
+            start = doc.metadata.get("start_index")
+            if start is None or start < 0:
+                passages.append((rank, doc.page_content))
+                continue
+            key = (doc.metadata.get("source"), doc.metadata.get("page_number"))
+            groups.setdefault(key, []).append((start, rank, doc.page_content))
+        for chunks in groups.values():
+            chunks.sort()
+            start, rank, text = chunks[0]
+            for next_start, next_rank, next_text in chunks[1:]:
+                end = start + len(text)
+                if next_start < end:
+                    text += next_text[end - next_start:]
+                    rank = min(rank, next_rank)
+                else:
+                    passages.append((rank, text))
+                    start, rank, text = next_start, next_rank, next_text
+            passages.append((rank, text))
+        passages.sort(key=lambda passage: passage[0])
+        return [text for _, text in passages]
+
+    @staticmethod
+    def pack(passages:list, context_tokens:int):
+        packed = []
+        used = 0
+        for text in passages:
+            tokens = estimate_tokens(text)
+            if used + tokens <= context_tokens:
+                packed.append(text)
+                used += tokens
+            elif not packed:
+                # never return an empty context because the best passage alone is too long
+                packed.append(text[:context_tokens * 4])
+                used = context_tokens
+        return packed
+
+    def assemble(self, query_vector, documents:list, vectors, k:int, lambda_mult:float, context_tokens:int,
+                 relevance:list=None):
+        """documents: candidate chunks in relevance order; vectors: their embeddings, one row each."""
+        if not documents:
+            return []
+        if len(documents) > k:
+            selected = self.mmr(np.asarray(query_vector, dtype="float32"), np.asarray(vectors, dtype="float32"),
+                                k, lambda_mult, relevance)
+            documents = [documents[i] for i in selected]
+        return self.pack(self.merge(documents), context_tokens)
@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+
+class SqliteIndexMap(MutableMapping):
+    """FAISS label -> docstore ID mapping read lazily from SQLite."""
+
+    def __init__(self, docstore):
+        self.docstore = docstore
+
+    def __getitem__(self, label):
+        row = self.docstore.execute("SELECT doc_id FROM index_map WHERE label = ?", (int(label),)).fetchone()
+        if row is None:
+            raise KeyError(label)
+        return row[0]
+
+    def __setitem__(self, label, doc_id):
+        self.update({label: doc_id})
+
+    def __delitem__(self, label):
+        if self.docstore.execute("DELETE FROM index_map WHERE label = ?", (int(label),)).rowcount == 0:
+            raise KeyError(label)
+
+    def __iter__(self):
+        return iter([row[0] for row in self.docstore.execute("SELECT label FROM index_map ORDER BY label")])
+
+    def __len__(self):
+        return self.docstore.execute("SELECT COUNT(*) FROM index_map").fetchone()[0]
+
+    def items(self):
+        return self.docstore.execute("SELECT label, doc_id FROM index_map ORDER BY label").fetchall()
+
+    def labels(self, doc_ids:list):
+        """{doc_id: label} for the given docstore IDs that are in the index."""
+        found = {}
+        for start in range(0, len(doc_ids), 500):
+            batch = doc_ids[start:start + 500]
+            found.update(self.docstore.execute(
+                f"SELECT doc_id, label FROM index_map WHERE doc_id IN ({','.join('?' * len(batch))})", batch).fetchall())
+        return found
+
+    def update(self, other=(), **kwargs):
+        pairs = list(dict(other, **kwargs).items())
+        self.docstore.executemany("INSERT OR REPLACE INTO index_map (label, doc_id) VALUES (?, ?)",
+                                  [(int(label), doc_id) for label, doc_id in pairs])
+
+
+class SqliteDocstore(Docstore, AddableMixin):
+
+    def __init__(self, path:str):
+        self.path = path
+        self._lock = threading.RLock()
+        self.closed = False
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS documents "
+                                "(id TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS index_map "
+                                "(label INTEGER PRIMARY KEY, doc_id TEXT NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS index_map_doc_id ON index_map (doc_id)")
+        self.connection.commit()
+        self.index_map = SqliteIndexMap(self)
+
+    def execute(self, query:str, params=()):
+        with self._lock:
+            return self.connection.execute(query, params)
+
+    def executemany(self, query:str, params:list):
+        with self._lock:
+            return self.connection.executemany(query, params)
+
+    def search(self, search:str):
+        row = self.execute("SELECT page_content, metadata FROM documents WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts:dict):
+        self.executemany("INSERT OR REPLACE INTO documents (id, page_content, metadata) VALUES (?, ?, ?)",
+                         [(doc_id, doc.page_content, json.dumps(doc.metadata)) for doc_id, doc in texts.items()])
+
+    def delete(self, ids:list):
+        self.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in ids])
+
+    def write_index_map(self, index_to_docstore_id):
+        if index_to_docstore_id is self.index_map:
+            return
+        with self._lock:
+            self.connection.execute("DELETE FROM index_map")
+            self.index_map.update(dict(index_to_docstore_id.items()))
+
+    def commit(self):
+        with self._lock:
+            self.connection.commit()
+
+    def close(self):
+        # also reached through a retired serving generation, so closing twice is fine
+        with self._lock:
+            if self.closed:
+                return
+            self.connection.commit()
+            self.connection.close()
+            self.closed = True
@@ -1,29 +1,59 @@
+import contextvars
 import faiss
+import logging
+import numpy as np
 import os
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from data_processing.loader import Loader, PdfFiles
+from data_processing.loader import Loader, PdfFiles, file_hash, json_loader, json_dumper
+from data_processing.pipeline import PdfPipeline
+from llm.context import ContextAssembler
+from llm.docstore import SqliteDocstore, SqliteIndexMap
+from llm.embedding_engine import EmbeddingEngine
+from llm.lexical import BM25Index, reciprocal_rank_fusion
+from llm.tracing import span
 
 
+logger = logging.getLogger(__name__)
+
+
+def chunk_ids(chunked_docs:list, file_hashes:dict):
+    counters = {}
+    ids = []
+    for doc in chunked_docs:
+        source = doc.metadata.get("source")
+        counters[source] = counters.get(source, -1) + 1
+        ids.append(f"{source}-{file_hashes[source][:16]}-{counters[source]}")
+    return ids
+
 
 class Documents:
 
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
+    def __init__(self, chunk_size=1000, chunk_overlap=200, paths:list=None, lazy=False):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.prepare()
+        self.paths = PdfFiles.pdfs if paths is None else paths
+        self.page_wise = False
+        if not lazy:
+            self.prepare()
 
     def prepare(self):
         docs = []
-        for path in PdfFiles.pdfs:
+        self.file_hashes = {}
+        for path in self.paths:
             line_start_idx = 0
             ld = Loader(path)
             doc = ld.start_from_line(line_start_idx)
             filename = ld.filename
             docs.append([filename, doc])
+            self.file_hashes[filename] = file_hash(path)
         self.docs = docs
 
     def prepare_splitted_document_chunks(self):
@@ -35,6 +65,7 @@ class Documents:
         )
         all_splits = text_splitter.split_documents(documents)
         self.chunked_docs = all_splits
+        self.page_wise = False
 
     def prepare_splitted_document_chunks_pagewise(self):
         documents = [[filename, document.split("||PAGE_BREAK||")] for filename, document in self.docs]
@@ -45,49 +76,659 @@ class Documents:
                                                               "page_number": page_no})
                 vec_documents.append(doc)
         self.chunked_docs = vec_documents
+        self.page_wise = True
+
+    def chunk_ids(self):
+        return chunk_ids(self.chunked_docs, self.file_hashes)
+
+    def split_document(self, filename:str, pages:list, page_wise:bool=False):
+        if page_wise:
+            return [Document(page_content = page, metadata={"source": filename, "page_number": page_no})
+                    for page_no, page in enumerate(pages, start=1)]
+        document = Document(page_content = '||PAGE_BREAK||'.join(pages), metadata={"source": filename})
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap,
+            separators=["\n\n", "\n", ". ", "? ", "! ", " "],
+            add_start_index=True
+        )
+        return text_splitter.split_documents([document])
+
+    def iter_chunked_documents(self, page_wise:bool=False, pipeline:PdfPipeline=None):
+        pipeline = pipeline or PdfPipeline()
+        self.page_wise = page_wise
+        for path, pages in pipeline.iter_documents(self.paths):
+            filename = os.path.basename(path).split('.')[0]
+            yield filename, file_hash(path), self.split_document(filename, pages, page_wise)
+
+
+class ServingGeneration:
+    """The FAISS store and lexical index loaded from one vector_db folder, with the searches using them.
+
+    After a swap the previous generation is retired; its SQLite connections are
+    closed once the last search still holding them has finished.
+    """
+
+    def __init__(self, vector_store:FAISS, lexical:BM25Index=None):
+        self.vector_store = vector_store
+        self.lexical = lexical
+        self.readers = 0
+        self.retired = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self.readers += 1
+
+    def release(self):
+        with self._lock:
+            self.readers -= 1
+            drained = self.retired and self.readers == 0
+        if drained:
+            self.close()
+
+    def retire(self):
+        with self._lock:
+            self.retired = True
+            drained = self.readers == 0
+        if drained:
+            self.close()
+
+    def close(self):
+        if isinstance(self.vector_store.docstore, SqliteDocstore):
+            self.vector_store.docstore.close()
+        if self.lexical is not None:
+            self.lexical.close()
 
 
-    
 class VectorStore:
 
-    def __init__(self, huggingface_embedding_model="sentence-transformers/all-mpnet-base-v2"):
+    index_types = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+    search_types = ("dense", "lexical", "hybrid")
+    index_meta_file = "index_meta.json"
+    manifest_file = "manifest.json"
+    docstore_file = "docstore.sqlite"
+    index_file = "index.faiss"
+    lexical_file = "lexical.sqlite"
+    db_folder = "./vector_db"
+
+    def __init__(self, huggingface_embedding_model="sentence-transformers/all-mpnet-base-v2",
+                 index_type:str="flat", nlist:int=1024, nprobe:int=16,
+                 pq_m:int=16, pq_nbits:int=8,
+                 hnsw_m:int=32, ef_construction:int=200, ef_search:int=64,
+                 embeddings=None, context:ContextAssembler=None, search_type:str="dense"):
+        if index_type not in self.index_types:
+            raise ValueError(f"Unknown index type: {index_type}. Expected one of {self.index_types}")
+        if search_type not in self.search_types:
+            raise ValueError(f"Unknown search type: {search_type}. Expected one of {self.search_types}")
         self.huggingface_embedding_model = huggingface_embedding_model
-        self.embeddings = HuggingFaceEmbeddings(model_name=self.huggingface_embedding_model)
+        self.embeddings = embeddings or EmbeddingEngine(self.huggingface_embedding_model)
         self.distance = 5
+        self.context = context or ContextAssembler()
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.search_type = search_type
+        self.vector_store = None
+        self.lexical = None
+        self._search_pool = None
+        self.manifest = None
+        self.index_path = None
+        self.index_mmapped = False
+        self.using_sample_vector = False
+        self.write_lock = threading.RLock()
+        self.serving = None
+        self._serving_lock = threading.Lock()
 
     @property
     def vector_store_loc(self):
-        if len(os.listdir('./vector_db')) > 0:
-            loc = './vector_db'
+        if os.path.isdir(self.db_folder) and len(os.listdir(self.db_folder)) > 0:
+            loc = self.db_folder
         else:
             loc = './vector_store'
         return loc
 
-    def create_empty_store(self):
-        embedding_dim = len(self.embeddings.embed_query("hello world"))
-        index = faiss.IndexFlatL2(embedding_dim)
+    @property
+    def index_params(self):
+        return {"index_type": self.index_type, "nlist": self.nlist, "nprobe": self.nprobe,
+                "pq_m": self.pq_m, "pq_nbits": self.pq_nbits, "hnsw_m": self.hnsw_m,
+                "ef_construction": self.ef_construction, "ef_search": self.ef_search}
+
+    def build_index(self, embedding_dim:int, training_vectors=None):
+        index_type = self.index_type
+        n_train = 0 if training_vectors is None else len(training_vectors)
+        if index_type == "ivf_pq" and n_train < 2 ** self.pq_nbits:
+            logger.warning("%d vectors are too few to train ivf_pq, falling back to ivf_flat", n_train)
+            index_type = "ivf_flat"
+        if index_type in ("ivf_flat", "ivf_pq") and n_train == 0:
+            logger.warning("No training vectors available for an IVF index, falling back to flat")
+            index_type = "flat"
+
+        self.built_index_type = index_type
+        if index_type == "flat":
+            index = faiss.IndexFlatL2(embedding_dim)
+        elif index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(embedding_dim, self.hnsw_m)
+            index.hnsw.efConstruction = self.ef_construction
+        else:
+            # keep roughly 39 training points per centroid, as faiss recommends
+            nlist = max(1, min(self.nlist, n_train // 39))
+            quantizer = faiss.IndexFlatL2(embedding_dim)
+            if index_type == "ivf_flat":
+                index = faiss.IndexIVFFlat(quantizer, embedding_dim, nlist)
+            else:
+                index = faiss.IndexIVFPQ(quantizer, embedding_dim, nlist, self.pq_m, self.pq_nbits)
+            index.train(np.asarray(training_vectors, dtype="float32"))
+        self.apply_search_params(index)
+        return index
+
+    def apply_search_params(self, index):
+        params = faiss.ParameterSpace()
+        if isinstance(index, faiss.IndexIVF):
+            params.set_index_parameter(index, "nprobe", self.nprobe)
+        elif isinstance(index, faiss.IndexHNSW):
+            params.set_index_parameter(index, "efSearch", self.ef_search)
+
+    def create_empty_store(self, training_vectors=None):
+        if training_vectors is not None and len(training_vectors) > 0:
+            embedding_dim = len(training_vectors[0])
+        else:
+            embedding_dim = len(self.embeddings.embed_query("hello world"))
+        index = self.build_index(embedding_dim, training_vectors)
         self.vector_store = FAISS(
             embedding_function=self.embeddings,
             index=index,
             docstore=InMemoryDocstore(),
             index_to_docstore_id={},
         )
+        # written next to the FAISS files on save
+        self.lexical = BM25Index()
 
     def add_documents(self, documents:Documents):
-        self.create_empty_store()
-        self.vector_store.add_documents(documents.chunked_docs)
-        self.vector_store.save_local('./vector_db')
+        def build(builder):
+            vectors = self.embeddings.embed_documents([doc.page_content for doc in documents.chunked_docs])
+            builder.create_empty_store(vectors)
+            builder.manifest = {"chunk_size": documents.chunk_size, "chunk_overlap": documents.chunk_overlap,
+                                "page_wise": documents.page_wise, "files": {}}
+            builder.append_documents(documents, vectors)
+            builder.save(builder.db_folder)
+        self.build_and_swap(build)
+
+    def append_documents(self, documents:Documents, vectors=None):
+        self.append_chunks(documents.chunked_docs, documents.file_hashes, vectors)
+
+    def append_chunks(self, chunked_docs:list, file_hashes:dict, vectors=None):
+        texts = [doc.page_content for doc in chunked_docs]
+        metadatas = [doc.metadata for doc in chunked_docs]
+        ids = chunk_ids(chunked_docs, file_hashes)
+        if vectors is None:
+            vectors = self.embeddings.embed_documents(texts)
+        if self.vector_store is None:
+            self.create_empty_store(vectors)
+        if texts:
+            self.append_embeddings(texts, vectors, metadatas, ids)
+        for source, sha in file_hashes.items():
+            self.manifest["files"][source] = {"sha256": sha, "chunks": 0}
+        for doc in chunked_docs:
+            self.manifest["files"][doc.metadata.get("source")]["chunks"] += 1
+
+    @property
+    def training_size(self):
+        if self.index_type == "ivf_flat":
+            return self.nlist * 39
+        if self.index_type == "ivf_pq":
+            return max(self.nlist, 2 ** self.pq_nbits) * 39
+        return 0
+
+    def append_document_stream(self, documents:Documents, page_wise:bool=False,
+                               pipeline:PdfPipeline=None, batch_size:int=256, progress=None):
+        # embeddings are flushed every batch_size chunks; a new IVF index waits
+        # until enough vectors are buffered to train it
+        chunks, hashes, vectors = [], {}, []
+        stream = documents.iter_chunked_documents(page_wise, pipeline)
+        for done, (source, sha, document_chunks) in enumerate(stream, start=1):
+            if progress is not None:
+                progress("embedding", done, len(documents.paths))
+            chunks += document_chunks
+            hashes[source] = sha
+            vectors += self.embeddings.embed_documents([doc.page_content for doc in document_chunks])
+            threshold = batch_size if self.vector_store is not None else max(batch_size, self.training_size)
+            if len(chunks) >= threshold:
+                self.append_chunks(chunks, hashes, vectors)
+                chunks, hashes, vectors = [], {}, []
+        if chunks or hashes or self.vector_store is None:
+            self.append_chunks(chunks, hashes, vectors)
+
+    def add_document_stream(self, documents:Documents, page_wise:bool=False,
+                            pipeline:PdfPipeline=None, batch_size:int=256, progress=None):
+        # saves into db_folder in place, so only builders call it; serving stores go through rebuild()
+        self.vector_store = None
+        self.manifest = {"chunk_size": documents.chunk_size, "chunk_overlap": documents.chunk_overlap,
+                         "page_wise": page_wise, "files": {}}
+        self.append_document_stream(documents, page_wise, pipeline, batch_size, progress)
+        if progress is not None:
+            progress("saving", len(documents.paths), len(documents.paths))
+        self.save(self.db_folder)
+
+    def rebuild(self, page_wise:bool=False, chunk_size:int=1000, chunk_overlap:int=200,
+                pipeline:PdfPipeline=None, progress=None):
+        """Re-embed the documents folder next to the serving store, then swap it in."""
+        documents = Documents(chunk_size, chunk_overlap, PdfFiles.list_pdfs(), lazy=True)
+        self.build_and_swap(lambda builder: builder.add_document_stream(documents, page_wise, pipeline,
+                                                                        progress=progress))
+        return {"documents": len(documents.paths), "chunks": self.vector_store.index.ntotal,
+                "index_type": getattr(self, "built_index_type", self.index_type)}
+
+    @staticmethod
+    def copy_folder(source:str, target:str):
+        # SQLite files go through the backup API so pages still in their WAL are included
+        os.makedirs(target)
+        for name in os.listdir(source):
+            if name.endswith(("-wal", "-shm", ".tmp")):
+                continue
+            if name.endswith(".sqlite"):
+                src, dst = sqlite3.connect(os.path.join(source, name)), sqlite3.connect(os.path.join(target, name))
+                try:
+                    src.backup(dst)
+                finally:
+                    src.close()
+                    dst.close()
+            else:
+                shutil.copy2(os.path.join(source, name), os.path.join(target, name))
+
+    def build_and_swap(self, build, copy:bool=False):
+        """Run build(builder) on a store in a private folder next to the serving one, then swap it in.
+
+        With copy, the builder starts from a copy of the serving store instead of
+        an empty one. Queries keep using the current index until the new one is
+        saved; a failed or cancelled build leaves the serving store and its
+        manifest untouched.
+        """
+        builder = VectorStore(self.huggingface_embedding_model, **self.index_params, embeddings=self.embeddings)
+        builder.db_folder = f"{self.db_folder}.building"
+        shutil.rmtree(builder.db_folder, ignore_errors=True)
+        try:
+            if copy:
+                self.copy_folder(self.db_folder, builder.db_folder)
+                builder.load()
+                builder.ensure_writable()
+            result = build(builder)
+            built = builder.vector_store is not None
+            builder.close()
+        except BaseException:
+            builder.close()
+            shutil.rmtree(builder.db_folder, ignore_errors=True)
+            raise
+        if not built:
+            shutil.rmtree(builder.db_folder, ignore_errors=True)
+            return result
+        with self.write_lock:
+            self.swap(builder.db_folder)
+        return result
+
+    def swap(self, folder:str):
+        # the old files are only unlinked, so searches still holding the previous
+        # index or docstore finish against them
+        previous = f"{self.db_folder}.previous"
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.isdir(self.db_folder):
+            os.rename(self.db_folder, previous)
+        os.rename(folder, self.db_folder)
+        self.load()
+        shutil.rmtree(previous, ignore_errors=True)
+
+    def close(self):
+        serving, self.serving = self.serving, None
+        if serving is not None:
+            # closed once in-flight searches are done
+            serving.retire()
+        if self.vector_store is not None and isinstance(self.vector_store.docstore, SqliteDocstore) and \
+                (serving is None or serving.vector_store is not self.vector_store):
+            self.vector_store.docstore.close()
+        if self.lexical is not None and (serving is None or serving.lexical is not self.lexical):
+            self.lexical.close()
+        if self._search_pool is not None:
+            self._search_pool.shutdown(wait=False)
+            self._search_pool = None
+
+    def append_embeddings(self, texts:list, vectors:list, metadatas:list, ids:list):
+        store = self.vector_store
+        if isinstance(store.index, faiss.IndexIVF):
+            # IVF labels are not compacted on removal, so new vectors get fresh labels
+            start = max(store.index_to_docstore_id, default=-1) + 1
+            labels = np.arange(start, start + len(ids), dtype="int64")
+            store.index.add_with_ids(np.asarray(vectors, dtype="float32"), labels)
+            store.docstore.add({doc_id: Document(id=doc_id, page_content=text, metadata=metadata)
+                                for doc_id, text, metadata in zip(ids, texts, metadatas)})
+            store.index_to_docstore_id.update(zip(labels.tolist(), ids))
+        else:
+            store.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+        if self.lexical is not None:
+            self.lexical.add(dict(zip(ids, texts)))
+
+    def delete_ids(self, ids:list):
+        store = self.vector_store
+        if not ids:
+            return
+        if self.lexical is not None:
+            self.lexical.delete(ids)
+        if isinstance(store.index, faiss.IndexHNSW):
+            # HNSW graphs cannot drop nodes, so the remaining vectors are re-inserted into a new graph
+            deleted = set(ids)
+            keep = [(label, doc_id) for label, doc_id in sorted(store.index_to_docstore_id.items())
+                    if doc_id not in deleted]
+            vectors = store.index.reconstruct_n(0, store.index.ntotal)[[label for label, _ in keep]]
+            index = self.build_index(store.index.d)
+            index.add(vectors)
+            store.docstore.delete(ids)
+            store.index = index
+            store.index_to_docstore_id = {i: doc_id for i, (_, doc_id) in enumerate(keep)}
+        elif isinstance(store.index, faiss.IndexIVF):
+            reverse = {doc_id: label for label, doc_id in store.index_to_docstore_id.items()}
+            labels = [reverse[doc_id] for doc_id in ids if doc_id in reverse]
+            store.index.remove_ids(np.asarray(labels, dtype="int64"))
+            store.docstore.delete([doc_id for doc_id in ids if doc_id in reverse])
+            for label in labels:
+                store.index_to_docstore_id.pop(label)
+        else:
+            store.delete(ids)
+
+    def remove_sources(self, sources:list):
+        for source in sources:
+            entry = self.manifest["files"].pop(source, None)
+            if entry:
+                # chunk IDs are derived from the source and its hash, see chunk_ids()
+                ids = entry.get("ids") or [f"{source}-{entry['sha256'][:16]}-{i}" for i in range(entry["chunks"])]
+                self.delete_ids(ids)
+
+    def sync_documents(self, paths:list=None, prune:bool=True, chunk_size:int=None,
+                       chunk_overlap:int=None, page_wise:bool=None, progress=None):
+        """Apply added, changed and deleted PDFs to a copy of the store and swap it in."""
+        with self.write_lock:
+            manifest = None if self.using_sample_vector else self.manifest
+            chunking = {"chunk_size": 1000, "chunk_overlap": 200, "page_wise": False}
+            if manifest:
+                chunking = {key: manifest[key] for key in chunking}
+            requested = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "page_wise": page_wise}
+            requested = {key: value for key, value in requested.items() if value is not None}
+            fresh = manifest is None or any(chunking[key] != value for key, value in requested.items())
+            if fresh:
+                # nothing reusable: rebuild from the whole documents folder instead of
+                # mixing chunkings or appending to the sample store
+                chunking.update(requested)
+                manifest = {**chunking, "files": {}}
+                paths = None
+
+            paths = PdfFiles.list_pdfs() if paths is None else paths
+            current = {os.path.basename(path).split('.')[0]: (path, file_hash(path)) for path in paths}
+            files = manifest["files"]
+            added = [source for source in current if source not in files]
+            updated = [source for source, (_, sha) in current.items()
+                       if source in files and files[source]["sha256"] != sha]
+            removed = [source for source in files if source not in current] if prune else []
+            changes = {"added": added, "updated": updated, "removed": removed}
+            if not fresh and not (added or updated or removed):
+                return changes
+
+            def build(builder):
+                if fresh:
+                    builder.manifest = manifest
+                else:
+                    builder.remove_sources(updated + removed)
+                to_embed = [current[source][0] for source in added + updated]
+                if to_embed:
+                    documents = Documents(chunking["chunk_size"], chunking["chunk_overlap"], to_embed, lazy=True)
+                    builder.append_document_stream(documents, chunking["page_wise"], progress=progress)
+                if builder.vector_store is not None:
+                    if progress is not None:
+                        progress("saving", len(to_embed), len(to_embed))
+                    builder.save(builder.db_folder)
+                return changes
+
+            return self.build_and_swap(build, copy=not fresh)
+
+    def add_document(self, path:str, progress=None):
+        return self.sync_documents([path], prune=False, progress=progress)
+
+    def remove_document(self, filename:str):
+        source = os.path.basename(filename).split('.')[0]
+        with self.write_lock:
+            if self.using_sample_vector or not self.manifest or source not in self.manifest["files"]:
+                raise ValueError(f"{filename} is not in the vector DB")
+
+            def build(builder):
+                builder.remove_sources([source])
+                builder.save(builder.db_folder)
+
+            self.build_and_swap(build, copy=True)
+        return {"added": [], "updated": [], "removed": [source]}
+
+    @staticmethod
+    def read_index_mmap(path:str):
+        # flat/HNSW codes map with MMAP_IFC, IVF inverted lists with MMAP
+        for flags in (faiss.IO_FLAG_MMAP_IFC, faiss.IO_FLAG_MMAP):
+            try:
+                return faiss.read_index(path, flags | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                continue
+        return faiss.read_index(path)
+
+    def ensure_writable(self):
+        # memory-mapped indexes are read-only; writers switch to an in-memory copy
+        if self.vector_store is not None and self.index_mmapped:
+            self.vector_store.index = faiss.read_index(self.index_path)
+            self.apply_search_params(self.vector_store.index)
+            self.index_mmapped = False
+
+    def save(self, path:str):
+        # the docstore and lexical index are committed in place when they already live in path, so
+        # path must be a builder's private folder; other workers may have the serving one mapped
+        os.makedirs(path, exist_ok=True)
+        store = self.vector_store
+        index_path = os.path.join(path, self.index_file)
+        docstore_path = os.path.join(path, self.docstore_file)
+        faiss.write_index(store.index, f"{index_path}.tmp")
+        if isinstance(store.docstore, SqliteDocstore) and os.path.samefile(store.docstore.path, docstore_path):
+            store.docstore.write_index_map(store.index_to_docstore_id)
+            store.docstore.commit()
+        else:
+            if os.path.exists(f"{docstore_path}.tmp"):
+                os.remove(f"{docstore_path}.tmp")
+            docstore = SqliteDocstore(f"{docstore_path}.tmp")
+            docstore.add({doc_id: store.docstore.search(doc_id) for doc_id in store.index_to_docstore_id.values()})
+            docstore.write_index_map(store.index_to_docstore_id)
+            docstore.close()
+            os.replace(f"{docstore_path}.tmp", docstore_path)
+            store.docstore = SqliteDocstore(docstore_path)
+            store.index_to_docstore_id = store.docstore.index_map
+        os.replace(f"{index_path}.tmp", index_path)
+        self.index_path = index_path
+        self.save_lexical(path)
+        if os.path.exists(os.path.join(path, "index.pkl")):
+            os.remove(os.path.join(path, "index.pkl"))
+        meta = {**self.index_params, "built_index_type": getattr(self, "built_index_type", self.index_type)}
+        json_dumper(meta, os.path.join(path, self.index_meta_file))
+        if self.manifest is not None:
+            json_dumper(self.manifest, os.path.join(path, self.manifest_file))
+
+    def save_lexical(self, path:str):
+        lexical_path = os.path.join(path, self.lexical_file)
+        if self.lexical is None:
+            # stores saved before the lexical index existed get one built from their docstore
+            store = self.vector_store
+            self.lexical = BM25Index()
+            doc_ids = list(store.index_to_docstore_id.values())
+            for start in range(0, len(doc_ids), 1000):
+                docs = {doc_id: store.docstore.search(doc_id) for doc_id in doc_ids[start:start + 1000]}
+                self.lexical.add({doc_id: doc.page_content for doc_id, doc in docs.items()
+                                  if isinstance(doc, Document)})
+        if os.path.exists(lexical_path) and self.lexical.path != ":memory:" and \
+                os.path.samefile(self.lexical.path, lexical_path):
+            self.lexical.commit()
+            return
+        self.lexical.copy_to(f"{lexical_path}.tmp")
+        os.replace(f"{lexical_path}.tmp", lexical_path)
+        self.lexical.close()
+        self.lexical = BM25Index(lexical_path)
 
     def load(self):
         loading_from = self.vector_store_loc
-        self.vector_store = FAISS.load_local(
-            loading_from,
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
+        docstore_path = os.path.join(loading_from, self.docstore_file)
+        if os.path.exists(docstore_path):
+            # the index is mapped instead of read and chunks are fetched by ID on demand,
+            # so startup does not grow with the corpus and workers share the page cache
+            index = self.read_index_mmap(os.path.join(loading_from, self.index_file))
+            docstore = SqliteDocstore(docstore_path)
+            vector_store = FAISS(
+                embedding_function=self.embeddings,
+                index=index,
+                docstore=docstore,
+                index_to_docstore_id=docstore.index_map,
+            )
+            index_mmapped = True
+        else:
+            vector_store = FAISS.load_local(
+                loading_from,
+                self.embeddings,
+                allow_dangerous_deserialization=True
+            )
+            index_mmapped = False
+        meta_path = os.path.join(loading_from, self.index_meta_file)
+        if os.path.exists(meta_path):
+            for param, value in json_loader(meta_path).items():
+                setattr(self, param, value)
+        manifest_path = os.path.join(loading_from, self.manifest_file)
+        manifest = json_loader(manifest_path) if os.path.exists(manifest_path) else None
+        self.apply_search_params(vector_store.index)
+        lexical_path = os.path.join(loading_from, self.lexical_file)
+        lexical = BM25Index(lexical_path) if os.path.exists(lexical_path) else None
+        # searches read the store and lexical index once, so they are replaced together after loading
+        with self._serving_lock:
+            previous = self.serving
+            self.serving = ServingGeneration(vector_store, lexical)
+            self.vector_store, self.lexical = vector_store, lexical
+        if previous is not None:
+            previous.retire()
+        self.manifest = manifest
+        self.index_path = os.path.join(loading_from, self.index_file)
+        self.index_mmapped = index_mmapped
         self.using_sample_vector = loading_from == './vector_store'
 
-    def similarity_search(self, query):
-        results = self.vector_store.similarity_search_with_score(query)
-        results = [doc.page_content for doc, score in results if score <= self.distance]
-        return results
\ No newline at end of file
+    def similarity_search(self, query, **options):
+        """Context passages for query; options override search_type and the assembler's k, fetch_k,
+        lambda_mult, context_tokens."""
+        with span("query_embedding"):
+            vector = np.asarray([self.embeddings.embed_query(query)], dtype="float32")
+        return self.search_vectors(vector, [query], **options)[0]
+
+    def embed_queries(self, queries:list):
+        with span("query_embedding"):
+            if hasattr(self.embeddings, "embed_queries"):
+                vectors = self.embeddings.embed_queries(queries)
+            else:
+                vectors = [self.embeddings.embed_query(query) for query in queries]
+        return np.asarray(vectors, dtype="float32").reshape(len(queries), -1)
+
+    def chunk_vectors(self, store:FAISS, labels:list, docs:dict):
+        """Stored embeddings for index labels, re-embedded (from the embedding cache) where the index cannot reconstruct."""
+        try:
+            vectors = store.index.reconstruct_batch(np.asarray(labels, dtype="int64"))
+        except RuntimeError:
+            # IVF indexes have no direct map
+            vectors = self.embeddings.embed_documents([docs[label].page_content for label in labels])
+        return dict(zip(labels, np.asarray(vectors, dtype="float32")))
+
+    @staticmethod
+    def labels_for(store:FAISS, doc_ids:list):
+        index_map = store.index_to_docstore_id
+        if isinstance(index_map, SqliteIndexMap):
+            return index_map.labels(doc_ids)
+        wanted = set(doc_ids)
+        return {doc_id: label for label, doc_id in index_map.items() if doc_id in wanted}
+
+    def lexical_search(self, store:FAISS, lexical:BM25Index, queries:list, k:int):
+        """BM25 rankings of queries as FAISS labels, best first, with their scores."""
+        hits = [lexical.search(query, k) for query in queries]
+        labels = self.labels_for(store, list({doc_id for row in hits for doc_id, _ in row}))
+        return [[(int(labels[doc_id]), score) for doc_id, score in row if doc_id in labels] for row in hits]
+
+    @property
+    def search_pool(self):
+        if self._search_pool is None:
+            self._search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical-search")
+        return self._search_pool
+
+    @contextmanager
+    def reading(self):
+        """(FAISS store, lexical index) of the serving generation, kept open until the block exits."""
+        with self._serving_lock:
+            serving = self.serving
+            if serving is None or serving.vector_store is not self.vector_store:
+                # a store built in place rather than loaded
+                serving = None
+                state = self.vector_store, self.lexical
+            else:
+                serving.acquire()
+                state = serving.vector_store, serving.lexical
+        try:
+            yield state
+        finally:
+            if serving is not None:
+                serving.release()
+
+    def search_vectors(self, vectors, queries:list=None, search_type:str=None, **options):
+        """similarity_search for a whole matrix of query vectors in one index search.
+
+        Lexical and hybrid search also need the query texts; hybrid search runs
+        BM25 alongside the FAISS search and merges both rankings with reciprocal
+        rank fusion. Without a lexical index both fall back to dense search.
+        """
+        if len(vectors) == 0:
+            return []
+        with self.reading() as (store, lexical_index):
+            return self.search_generation(store, lexical_index, vectors, queries, search_type, **options)
+
+    def search_generation(self, store:FAISS, lexical_index:BM25Index, vectors, queries:list=None,
+                          search_type:str=None, **options):
+        search_type = search_type or self.search_type
+        if search_type not in self.search_types:
+            raise ValueError(f"Unknown search type: {search_type}. Expected one of {self.search_types}")
+        if queries is None or lexical_index is None:
+            search_type = "dense"
+        options = self.context.options(**options)
+        vectors = np.asarray(vectors, dtype="float32")
+        lexical = None
+        if search_type != "dense":
+            lexical = self.search_pool.submit(contextvars.copy_context().run, self.lexical_search,
+                                              store, lexical_index, queries, options["fetch_k"])
+        rows = [[] for _ in vectors]
+        if search_type != "lexical":
+            with span("faiss_search"):
+                scores, labels = store.index.search(vectors, options["fetch_k"])
+            rows = [[int(label) for label, score in zip(row_labels, row_scores)
+                     if label != -1 and score <= self.distance]
+                    for row_labels, row_scores in zip(labels, scores)]
+        relevance = [None] * len(rows)
+        if lexical is not None:
+            ranked = [reciprocal_rank_fusion([dense, [label for label, _ in hits]])[:options["fetch_k"]]
+                      if search_type == "hybrid" else hits
+                      for dense, hits in zip(rows, lexical.result())]
+            rows = [[label for label, _ in row] for row in ranked]
+            relevance = [[score for _, score in row] for row in ranked]
+        with span("context_assembly"):
+            wanted = sorted({label for row in rows for label in row})
+            docs = {label: store.docstore.search(store.index_to_docstore_id[label]) for label in wanted}
+            needs_mmr = [label for row in rows if len(row) > options["k"] for label in row]
+            chunk_vectors = self.chunk_vectors(store, sorted(set(needs_mmr)), docs) if needs_mmr else {}
+            return [self.context.assemble(vector, [docs[label] for label in row],
+                                          [chunk_vectors[label] for label in row] if len(row) > options["k"] else None,
+                                          options["k"], options["lambda_mult"], options["context_tokens"],
+                                          row_relevance)
+                    for vector, row, row_relevance in zip(vectors, rows, relevance)]
+
+    def similarity_search_batch(self, queries:list, **options):
+        return self.search_vectors(self.embed_queries(queries), queries, **options)
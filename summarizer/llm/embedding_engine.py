@@ -0,0 +1,118 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCache:
+    """Content-hash -> vector store in SQLite, shared safely by ingestion jobs and API workers."""
+
+    def __init__(self, folder:str):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, "vectors.sqlite")
+        self._lock = threading.Lock()
+        # concurrent writers wait for each other's transactions instead of failing
+        self.connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS vectors "
+                                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID")
+        self.connection.commit()
+
+    @staticmethod
+    def key(text:str):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, keys:list):
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = list(dict.fromkeys(keys[start:start + 500]))
+                placeholders = ','.join('?' * len(batch))
+                found.update(self.connection.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({placeholders})", batch).fetchall())
+        return [np.frombuffer(found[key], dtype="float32") if key in found else None for key in keys]
+
+    def put(self, keys:list, vectors):
+        rows = [(key, np.asarray(vector, dtype="float32").tobytes()) for key, vector in zip(keys, vectors)]
+        if not rows:
+            return
+        with self._lock:
+            self.connection.executemany("INSERT OR IGNORE INTO vectors (key, vector) VALUES (?, ?)", rows)
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class EmbeddingEngine(Embeddings):
+
+    def __init__(self, model_name:str="sentence-transformers/all-mpnet-base-v2",
+                 batch_size:int=64, num_workers:int=1, backend:str="torch",
+                 model_file:str=None, device:str=None, cache_folder:str="./embedding_cache"):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.backend = backend
+        self.model_file = model_file
+        self.device = device
+        self.cache = EmbeddingCache(os.path.join(cache_folder, self.cache_name)) if cache_folder else None
+        self._model = None
+        self._pool = None
+
+    @property
+    def cache_name(self):
+        name = '-'.join(filter(None, [self.model_name, self.backend, self.model_file]))
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            # backend="onnx"/"openvino" with e.g. model_file="onnx/model_qint8_avx512_vnni.onnx"
+            # loads an exported or quantized model instead of the torch weights
+            model_kwargs = {"file_name": self.model_file} if self.model_file else None
+            self._model = SentenceTransformer(self.model_name, device=self.device,
+                                              backend=self.backend, model_kwargs=model_kwargs)
+        return self._model
+
+    def encode(self, texts:list):
+        if self.num_workers > 1 and len(texts) >= self.batch_size * self.num_workers:
+            if self._pool is None:
+                self._pool = self.model.start_multi_process_pool(["cpu"] * self.num_workers)
+            vectors = self.model.encode(texts, batch_size=self.batch_size, pool=self._pool)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size)
+        return np.asarray(vectors, dtype="float32")
+
+    def embed_documents(self, texts:list):
+        texts = [text.replace("\n", " ") for text in texts]
+        if self.cache is None:
+            return self.encode(texts).tolist()
+        keys = [self.cache.key(text) for text in texts]
+        vectors = self.cache.get(keys)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            encoded = dict(zip(missing, self.encode(missing)))
+            self.cache.put([self.cache.key(text) for text in missing], list(encoded.values()))
+            vectors = [encoded[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return [np.asarray(vector).tolist() for vector in vectors]
+
+    def embed_query(self, text:str):
+        return self.encode([text.replace("\n", " ")])[0].tolist()
+
+    def embed_queries(self, texts:list):
+        # one batched forward pass; queries are not written to the document cache
+        return self.encode([text.replace("\n", " ") for text in texts])
+
+    def close(self):
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
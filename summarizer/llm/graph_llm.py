@@ -1,9 +1,11 @@
+import asyncio
 from langchain_neo4j import GraphCypherQAChain
+from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
 from langchain.prompts import PromptTemplate
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
-from langchain_deepseek import ChatDeepSeek
+from graph.plan_cache import CypherPlanCache
 from graph.prepare import Graph
+from llm.providers import chat_model_class
+from llm.tracing import llm_usage, span
 
 
 CYPHER_PROMPT = """
@@ -36,12 +38,13 @@ class GraphLlm(Graph):
                          allowed_nodes, allowed_relationships,
                         cypher_model_name, cypher_model_api)
         self.include_types = ((allowed_nodes or []) + (allowed_relationships or [])) or []
-        llms = {"openai": ChatOpenAI, "groq": ChatGroq, "deepseek": ChatDeepSeek}
-        self.QAllm = llms.get(query_model_api)(
+        self.QAllm = chat_model_class(query_model_api)(
             api_key=query_model_api_key,
             model_name=query_model_name,
-            temperature=0.3
+            temperature=0.3,
+            callbacks=[llm_usage]
         )
+        self.plan_cache = CypherPlanCache()
         self.create_chain()        
 
     def create_chain(self):
@@ -57,11 +60,70 @@ class GraphLlm(Graph):
             cypher_prompt=PromptTemplate.from_template(CYPHER_PROMPT)
         )
 
-    def query_llm(self, query:str):
-        mappings = self.get_id_label_mapping(query)
+    def on_schema_change(self):
+        # the chain embeds the schema text it was built with
+        self.create_chain()
+
+    async def generate_cypher(self, prompt:dict):
+        args = {"question": prompt["query"], "schema": self.chain.graph_schema, **prompt}
+        with span("cypher_generation"):
+            cypher = extract_cypher(await self.chain.cypher_generation_chain.ainvoke(args))
+        if self.chain.cypher_query_corrector:
+            cypher = self.chain.cypher_query_corrector(cypher)
+        return cypher
+
+    async def run_cypher(self, cypher:str, params:dict=None):
+        if not cypher:
+            return []
+        with span("cypher_execution"):
+            context = await asyncio.to_thread(self.graph.query, cypher, params or {})
+        return context[:self.chain.top_k]
+
+    async def retrieve(self, query:str):
+        # the steps of GraphCypherQAChain, so that a cached plan can stand in for Cypher generation
+        entities = await self.match_entities(query)
+        mappings = self.format_mapping(entities)
         relationships = self.get_relationships()
         prompt = {"allowed_nodes":self.allowed_nodes, "node_mappings":mappings,
                   "allowed_relationships":self.allowed_relationships,
                   "relationships":relationships, "query": query}
-        res = self.chain.invoke(prompt)
-        return res
\ No newline at end of file
+        key, names = self.plan_cache.shape(query, entities, self.schema_key)
+        plan = self.plan_cache.get(key) if key is not None else None
+        context = None
+        if plan is not None:
+            cypher = plan.cypher
+            try:
+                context = await self.run_cypher(plan.cypher, plan.params(names))
+            except Exception:
+                context = None
+            if not context:
+                self.plan_cache.evict(key)
+                context = None
+        if context is None:
+            plan = None
+            cypher = await self.generate_cypher(prompt)
+            context = await self.run_cypher(cypher)
+            if context and key is not None:
+                self.plan_cache.put(key, cypher, names)
+        return prompt, cypher, context, plan is not None
+
+    async def answer(self, query:str, context:list):
+        with span("qa_llm"):
+            return await self.chain.qa_chain.ainvoke({"question": query, "context": context})
+
+    async def query_llm(self, query:str):
+        prompt, _, context, _ = await self.retrieve(query)
+        result = await self.answer(query, context)
+        return {**prompt, "result": result}
+
+    async def stream_events(self, query:str):
+        """Yield (event, data) pairs: the Cypher, the graph rows, answer tokens and the final response."""
+        prompt, cypher, context, plan_hit = await self.retrieve(query)
+        yield "cypher", {"cypher": cypher, "plan_cache_hit": plan_hit}
+        yield "graph_rows", {"rows": context}
+        tokens = []
+        with span("qa_llm"):
+            async for token in self.chain.qa_chain.astream({"question": query, "context": context}):
+                tokens.append(token)
+                yield "token", token
+        yield "done", {**prompt, "result": ''.join(tokens)}
\ No newline at end of file
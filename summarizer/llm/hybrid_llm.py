@@ -1,6 +1,9 @@
+import asyncio
+import time
 from llm.embedding import VectorStore
 from llm.vector_llm import VectorLlm
-from llm.graph_llm import GraphLlm
+from llm.session_store import SessionStore
+from llm.tracing import span
 
 
 class HybridLlm:
@@ -11,7 +14,7 @@ class HybridLlm:
                  neo4j_url, neo4j_username, neo4j_password, system_role_prompt:str=None,
                  cypher_model_api:str="groq", query_model_api:str="groq",
                  allowed_nodes:list=None, allowed_relationships:list=None,
-                 history_tracking=False):
+                 history_tracking=False, pipelined=True, sessions:SessionStore=None):
         
         
         self.cypher_model_name = cypher_model_name
@@ -28,25 +31,137 @@ class HybridLlm:
         self.allowed_nodes = allowed_nodes
         self.allowed_relationships = allowed_relationships
         self.history_tracking = history_tracking
-        self.llms_loaded = False
-        
-        
+        self.pipelined = pipelined
+        # kept here so sessions survive get_llms() rebuilding the vector LLM
+        self.sessions = sessions or SessionStore()
+        self.vector_llm = None
+        self.graph_llm = None
+
+    @property
+    def llms_loaded(self):
+        return self.vector_llm is not None and self.graph_llm is not None
+
     def get_llms(self):
+        self.get_vector_llm()
+        self.get_graph_llm()
+
+    def get_vector_llm(self):
         self.vector_llm = VectorLlm(self.query_model_name, self.query_model_api_key,
                                     self.vector_store, self.system_role_prompt,
-                                    self.history_tracking)
+                                    self.history_tracking, self.sessions)
+        return self.vector_llm
+
+    def get_graph_llm(self):
+        # imported here so that importing the API does not load Neo4j and the LLM provider packages;
+        # built apart from the vector LLM, so vector answers do not depend on Neo4j being reachable
+        from llm.graph_llm import GraphLlm
         self.graph_llm = GraphLlm(self.cypher_model_name, self.cypher_model_api_key,
                                   self.query_model_name, self.query_model_api_key,
                                   self.neo4j_url, self.neo4j_username, self.neo4j_password,
                                   self.cypher_model_api, self.query_model_api,
                                   self.allowed_nodes, self.allowed_relationships)
-        self.llms_loaded = True
+        return self.graph_llm
 
-    def query_llm(self, query:str):
-        graph_response = self.graph_llm.query_llm(query)
+    @staticmethod
+    def build_prompt(query:str, graph_response:dict):
         graph_context = graph_response.get('result')
         prompt = f"""Knowledge Graph Context: {graph_context}
 Use the above KG context also for the query:\n{query}"""
+        return prompt
+
+    @staticmethod
+    async def timed(stage:str, awaitable, timings:dict):
+        start = time.perf_counter()
+        try:
+            with span(stage):
+                return await awaitable
+        finally:
+            timings[stage] = round(time.perf_counter() - start, 4)
+
+    async def query_llm(self, query:str, context:str=None, session_id:str=None, retrieval:dict=None):
+        if not self.pipelined:
+            return await self.query_llm_sequential(query, session_id, retrieval)
+        start = time.perf_counter()
+        timings = {}
+        # Vector retrieval only depends on the query, so it runs alongside the
+        # graph chain and the two branches are joined for the final answer.
+        # Batch callers pass a context retrieved for many queries at once.
+        if context is None:
+            vector_branch = self.timed("vector_retrieval", self.vector_llm.retrieve_context(query, retrieval), timings)
+        else:
+            vector_branch = asyncio.sleep(0, context)
+        graph_response, context = await asyncio.gather(
+            self.timed("graph", self.graph_llm.query_llm(query), timings),
+            vector_branch
+        )
+        prompt = self.build_prompt(query, graph_response)
+        answer = await self.timed("synthesis", self.vector_llm.query_llm(prompt, context, session_id, query), timings)
+        timings["total"] = round(time.perf_counter() - start, 4)
+        response = {"graph_response": graph_response,
+                    "response": answer,
+                    "timings": timings}
+        return response
+
+    async def stream_events(self, query:str, session_id:str=None, retrieval:dict=None, context:str=None):
+        """Yield (event, data) pairs while the graph and vector branches run, then the synthesis tokens."""
+        start = time.perf_counter()
+        timings = {}
+        events = asyncio.Queue()
+
+        async def graph_branch():
+            prompt, cypher, rows, plan_hit = await self.graph_llm.retrieve(query)
+            events.put_nowait(("cypher", {"cypher": cypher, "plan_cache_hit": plan_hit}))
+            events.put_nowait(("graph_rows", {"rows": rows}))
+            result = await self.graph_llm.answer(query, rows)
+            events.put_nowait(("graph_answer", {"result": result}))
+            return {**prompt, "result": result}
+
+        async def vector_branch():
+            # a context retrieved with the routing embedding is reused as is
+            retrieved = context if context is not None else await self.vector_llm.retrieve_context(query, retrieval)
+            events.put_nowait(("retrieval", {"characters": len(retrieved)}))
+            return retrieved
+
+        branches = [asyncio.create_task(self.timed("graph", graph_branch(), timings)),
+                    asyncio.create_task(self.timed("vector_retrieval", vector_branch(), timings))]
+        getter = None
+        try:
+            while not all(branch.done() for branch in branches) or not events.empty():
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({getter, *branches}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+                for branch in branches:
+                    # a failed branch fails the stream right away; the finally below stops its sibling
+                    if branch.done() and not branch.cancelled() and branch.exception() is not None:
+                        raise branch.exception()
+            graph_response, context = (branch.result() for branch in branches)
+        finally:
+            # cancel and await whatever is still running so no branch is left orphaned or unretrieved
+            pending = [task for task in (getter, *branches) if task is not None]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        prompt = self.build_prompt(query, graph_response)
+        synthesis_start = time.perf_counter()
+        tokens = []
+        with span("synthesis"):
+            async for token in self.vector_llm.stream_llm(prompt, context, session_id, query):
+                tokens.append(token)
+                yield "token", token
+        timings["synthesis"] = round(time.perf_counter() - synthesis_start, 4)
+        timings["total"] = round(time.perf_counter() - start, 4)
+        yield "done", {"graph_response": graph_response,
+                       "response": ''.join(tokens).strip(),
+                       "timings": timings}
+
+    async def query_llm_sequential(self, query:str, session_id:str=None, retrieval:dict=None):
+        graph_response = await self.graph_llm.query_llm(query)
+        prompt = self.build_prompt(query, graph_response)
         response = {"graph_response": graph_response,
-                    "response": self.vector_llm.query_llm(prompt)}
-        return response
\ No newline at end of file
+                    "response": await self.vector_llm.query_llm(prompt, session_id=session_id, record_as=query,
+                                                         retrieval=retrieval)}
+        return response
@@ -0,0 +1,162 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from llm.tracing import span
+
+
+# section numbers, acronyms and codes stay whole ("12.3", "aml/cft", "ifrs-9") and are also indexed by part
+TOKEN = re.compile(r"[a-z0-9]+(?:[./&-][a-z0-9]+)*")
+SEPARATORS = re.compile(r"[./&-]")
+STOPWORDS = frozenset("""a an and are as at be but by for from has have in into is it its of on or that the
+their there these this to was were which will with what who how when where why does did do can""".split())
+RRF_K = 60
+
+
+def tokenize(text:str):
+    tokens = []
+    for token in TOKEN.findall(str(text).lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = SEPARATORS.split(token)
+        if len(parts) > 1:
+            tokens += [part for part in parts if part not in STOPWORDS]
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings:list, k:int=RRF_K):
+    """[(key, score)] best first, where each key scores sum(1 / (k + rank)) over the rankings it appears in."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """Okapi BM25 over chunk texts, kept as SQLite postings next to the FAISS files.
+
+    Chunks are added and removed individually, so document syncs update the
+    index in place; document frequencies and corpus statistics are maintained
+    alongside the postings instead of being recomputed at query time.
+    """
+
+    def __init__(self, path:str=":memory:", k1:float=1.2, b:float=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.closed = False
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS chunks (doc_id TEXT PRIMARY KEY, length INTEGER NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, doc_id TEXT NOT NULL, "
+                                "tf INTEGER NOT NULL, PRIMARY KEY (term, doc_id)) WITHOUT ROWID")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS postings_doc_id ON postings (doc_id)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.connection.execute("INSERT OR IGNORE INTO stats VALUES ('documents', 0), ('total_length', 0)")
+        self.connection.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.connection.execute("SELECT key, value FROM stats").fetchall())
+        return stats["documents"], stats["total_length"]
+
+    def update_counts(self, df:Counter, documents:int, total_length:int):
+        self.connection.executemany("INSERT INTO terms (term, df) VALUES (?, ?) "
+                                    "ON CONFLICT (term) DO UPDATE SET df = df + excluded.df", df.items())
+        self.connection.execute("DELETE FROM terms WHERE df <= 0")
+        self.connection.executemany("UPDATE stats SET value = value + ? WHERE key = ?",
+                                    [(documents, "documents"), (total_length, "total_length")])
+
+    def add(self, texts:dict):
+        """texts: {doc_id: chunk text}; a doc_id already indexed is replaced."""
+        if not texts:
+            return
+        with self._lock:
+            self.delete(list(texts))
+            df = Counter()
+            chunks, postings = [], []
+            for doc_id, text in texts.items():
+                counts = Counter(tokenize(text))
+                chunks.append((doc_id, sum(counts.values())))
+                postings += [(term, doc_id, tf) for term, tf in counts.items()]
+                df.update(counts.keys())
+            self.connection.executemany("INSERT INTO chunks (doc_id, length) VALUES (?, ?)", chunks)
+            self.connection.executemany("INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)", postings)
+            self.update_counts(df, len(chunks), sum(length for _, length in chunks))
+
+    def delete(self, ids:list):
+        with self._lock:
+            df = Counter()
+            documents, total_length = 0, 0
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.connection.execute(f"SELECT doc_id, length FROM chunks WHERE doc_id IN ({placeholders})",
+                                               batch).fetchall()
+                if not rows:
+                    continue
+                found = [doc_id for doc_id, _ in rows]
+                placeholders = ','.join('?' * len(found))
+                df.update(term for (term,) in self.connection.execute(
+                    f"SELECT term FROM postings WHERE doc_id IN ({placeholders})", found))
+                self.connection.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", found)
+                self.connection.execute(f"DELETE FROM chunks WHERE doc_id IN ({placeholders})", found)
+                documents -= len(rows)
+                total_length -= sum(length for _, length in rows)
+            if documents:
+                self.update_counts(Counter({term: -count for term, count in df.items()}), documents, total_length)
+
+    def search(self, query:str, k:int):
+        """[(doc_id, score)] of the k best chunks for query, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with span("lexical_search"), self._lock:
+            documents, total_length = self.stats()
+            if not documents:
+                return []
+            avg_length = total_length / documents
+            placeholders = ','.join('?' * len(terms))
+            df = dict(self.connection.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms))
+            if not df:
+                return []
+            idf = {term: math.log(1 + (documents - count + 0.5) / (count + 0.5)) for term, count in df.items()}
+            placeholders = ','.join('?' * len(df))
+            rows = self.connection.execute(
+                f"SELECT p.term, p.doc_id, p.tf, c.length FROM postings p JOIN chunks c ON c.doc_id = p.doc_id "
+                f"WHERE p.term IN ({placeholders})", list(df)).fetchall()
+        scores = {}
+        for term, doc_id, tf, length in rows:
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def count(self):
+        return self.stats()[0]
+
+    def copy_to(self, path:str):
+        with self._lock:
+            self.connection.commit()
+            target = sqlite3.connect(path)
+            try:
+                self.connection.backup(target)
+            finally:
+                target.close()
+
+    def commit(self):
+        with self._lock:
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.connection.commit()
+            self.connection.close()
+            self.closed = True
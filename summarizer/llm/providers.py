@@ -0,0 +1,16 @@
+import importlib
+
+
+# provider packages are heavy to import, so each is only loaded once a model of that API is built
+CHAT_MODELS = {
+    "openai": ("langchain_openai", "ChatOpenAI"),
+    "groq": ("langchain_groq", "ChatGroq"),
+    "deepseek": ("langchain_deepseek", "ChatDeepSeek"),
+}
+
+
+def chat_model_class(api:str):
+    if api not in CHAT_MODELS:
+        raise ValueError(f"Unknown model API: {api}. Expected one of {tuple(CHAT_MODELS)}")
+    module, name = CHAT_MODELS[api]
+    return getattr(importlib.import_module(module), name)
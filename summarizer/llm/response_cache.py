@@ -0,0 +1,148 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+import faiss
+import numpy as np
+
+
+class ResponseCache:
+    """Responses by normalized query and, with `semantic`, by embedding similarity to past queries.
+
+    Questions that differ only in the entity they ask about ("revenue of Bank X" vs
+    "Bank Y") embed almost identically, so a semantic hit also needs the same entity
+    key: the graph entities passed by the caller plus the capitalized and numeric
+    terms of the query. The cache lives in one process; clearing it only affects
+    the worker it belongs to.
+    """
+
+    def __init__(self, embeddings=None, max_entries:int=1024, ttl:float=3600,
+                 similarity_threshold:float=0.95, semantic:bool=False):
+        self.embeddings = embeddings
+        self.semantic = semantic and embeddings is not None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self.invalidations = 0
+        self.reset()
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query:str):
+        return ' '.join(query.lower().split())
+
+    @staticmethod
+    def entity_key(query:str, entities=None):
+        terms = re.findall(r"[A-Za-z0-9][\w&.-]*", query)
+        # names and figures; the first word is capitalized anyway
+        names = {term.lower().rstrip(".") for i, term in enumerate(terms)
+                 if any(c.isdigit() for c in term) or (i and term[0].isupper() and term != "I")}
+        return frozenset(names | {entity.lower() for entity in entities or ()})
+
+    def reset(self):
+        self.entries = OrderedDict()
+        self.keys_by_id = {}
+        self.next_id = 0
+        self.indexes = {}
+
+    def clear(self):
+        with self._lock:
+            self.reset()
+            self.invalidations += 1
+
+    def embed(self, query:str):
+        vector = np.asarray([self.embeddings.embed_query(query)], dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
+    def semantic_index(self, namespace:str, dim:int):
+        index = self.indexes.get(namespace)
+        if index is None:
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+            self.indexes[namespace] = index
+        return index
+
+    def evict(self, key):
+        entry = self.entries.pop(key, None)
+        if entry and entry["id"] is not None:
+            self.keys_by_id.pop(entry["id"], None)
+            self.indexes[key[0]].remove_ids(np.asarray([entry["id"]], dtype="int64"))
+
+    def expired(self, entry:dict):
+        return self.ttl and time.time() - entry["created"] > self.ttl
+
+    def lookup_exact(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self.expired(entry):
+            self.evict(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def get(self, namespace:str, query:str, vector=None, entities=None):
+        """Return (response, normalized query vector); a precomputed vector skips embedding.
+
+        entities are the graph entities named in the query; a semantic hit must name the same.
+        """
+        key = (namespace, self.normalize(query))
+        with self._lock:
+            entry = self.lookup_exact(key)
+            if entry is not None:
+                self.hits_exact += 1
+                return entry["response"], None
+        if not self.semantic:
+            with self._lock:
+                self.misses += 1
+            return None, None
+        if vector is None:
+            vector = self.embed(key[1])
+        else:
+            vector = np.array(vector, dtype="float32").reshape(1, -1)
+            faiss.normalize_L2(vector)
+        with self._lock:
+            index = self.indexes.get(namespace)
+            if index is not None and index.ntotal > 0:
+                scores, ids = index.search(vector, 1)
+                if ids[0][0] != -1 and scores[0][0] >= self.similarity_threshold:
+                    match_key = self.keys_by_id.get(int(ids[0][0]))
+                    entry = self.lookup_exact(match_key) if match_key else None
+                    if entry is not None and entry["entities"] == self.entity_key(query, entities):
+                        self.hits_semantic += 1
+                        return entry["response"], vector
+            self.misses += 1
+        return None, vector
+
+    def put(self, namespace:str, query:str, response, vector=None, generation:int=None, entities=None):
+        key = (namespace, self.normalize(query))
+        with self._lock:
+            if generation is not None and generation != self.invalidations:
+                # the underlying data changed while this response was being generated
+                return
+            self.evict(key)
+            entry_id = None
+            if vector is not None and self.semantic:
+                entry_id = self.next_id
+                self.next_id += 1
+                index = self.semantic_index(namespace, vector.shape[1])
+                index.add_with_ids(vector, np.asarray([entry_id], dtype="int64"))
+                self.keys_by_id[entry_id] = key
+            self.entries[key] = {"response": response, "id": entry_id, "created": time.time(),
+                                 "entities": self.entity_key(query, entities)}
+            while len(self.entries) > self.max_entries:
+                self.evict(next(iter(self.entries)))
+
+    def stats(self):
+        lookups = self.hits_exact + self.hits_semantic + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits_exact": self.hits_exact,
+            "hits_semantic": self.hits_semantic,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_exact + self.hits_semantic) / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
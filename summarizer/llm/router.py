@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import numpy as np
+from llm.embedding import VectorStore
+from llm.tracing import span
+
+
+class QueryRouter:
+    """Picks vector, graph or hybrid answering per query from signals that need no LLM call.
+
+    The signals are the graph nodes the query names (local entity match against
+    the node index), the L2 distance of the closest FAISS chunk and the query
+    length. Without any graph entity the graph pipeline cannot find a starting
+    node, so the query goes to the vector LLM alone. With entities but no close
+    chunk, the graph answers alone unless the question is long enough to need
+    both. Every decision is counted and, with a log file, appended as a JSON line
+    off the event loop; the file is rotated to `<log_file>.1` at max_log_bytes.
+    """
+
+    routes = ("vector", "graph", "hybrid")
+    # LLM calls per route: hybrid = Cypher generation + graph QA + synthesis
+    llm_calls = {"vector": 1, "graph": 2, "hybrid": 3}
+
+    def __init__(self, vector_store:VectorStore, max_distance:float=1.0, long_query_tokens:int=40,
+                 log_file:str=None, max_log_bytes:int=10_000_000):
+        self.vector_store = vector_store
+        self.max_distance = max_distance
+        self.long_query_tokens = long_query_tokens
+        self.log_file = log_file
+        self.max_log_bytes = max_log_bytes
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self.counts = {route: 0 for route in self.routes}
+        self.reasons = {}
+        self.llm_calls_saved = 0
+
+    def top_distance(self, vector):
+        index = self.vector_store.vector_store.index
+        if index.ntotal == 0:
+            return None
+        distances, labels = index.search(np.asarray(vector, dtype="float32").reshape(1, -1), 1)
+        return float(distances[0][0]) if labels[0][0] != -1 else None
+
+    async def signals(self, query:str, graph=None):
+        """(signals, query vector); graph is a graph.prepare.Graph, or None when the graph is unavailable."""
+        async def vector_signals():
+            vector = (await asyncio.to_thread(self.vector_store.embed_queries, [query]))[0]
+            return vector, await asyncio.to_thread(self.top_distance, vector)
+
+        async def graph_signals():
+            if graph is None:
+                return None
+            # the LLM fallback of the entity matcher would defeat the purpose of routing
+            return await graph.match_entities(query, llm_fallback=False)
+
+        with span("routing"):
+            (vector, top_distance), entities = await asyncio.gather(vector_signals(), graph_signals())
+        signals = {"entities": None if entities is None else sorted(entities),
+                   "top_distance": None if top_distance is None else round(top_distance, 4),
+                   "query_tokens": len(query.split())}
+        return signals, vector
+
+    def decide(self, signals:dict):
+        """(route, reason) for the signals of one query."""
+        if signals["entities"] is None:
+            return "vector", "graph_unavailable"
+        if not signals["entities"]:
+            return "vector", "no_graph_entities"
+        if signals["top_distance"] is not None and signals["top_distance"] <= self.max_distance:
+            return "hybrid", "entities_and_close_chunks"
+        if signals["query_tokens"] >= self.long_query_tokens:
+            return "hybrid", "long_query"
+        return "graph", "no_close_chunks"
+
+    async def route(self, query:str, graph=None):
+        """Decide the route of query; returns the decision and the query embedding for reuse."""
+        signals, vector = await self.signals(query, graph)
+        route, reason = self.decide(signals)
+        decision = {"route": route, "reason": reason, "signals": signals}
+        self.record(decision)
+        if self.log_file:
+            await asyncio.to_thread(self.write_log, {"time": time.time(), "query": query, **decision})
+        return decision, vector
+
+    def record(self, decision:dict):
+        with self._lock:
+            self.counts[decision["route"]] += 1
+            self.reasons[decision["reason"]] = self.reasons.get(decision["reason"], 0) + 1
+            self.llm_calls_saved += self.llm_calls["hybrid"] - self.llm_calls[decision["route"]]
+
+    def write_log(self, entry:dict):
+        with self._log_lock:
+            if self.max_log_bytes and os.path.exists(self.log_file) and \
+                    os.path.getsize(self.log_file) >= self.max_log_bytes:
+                os.replace(self.log_file, f"{self.log_file}.1")
+            with open(self.log_file, 'a', encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    def stats(self):
+        with self._lock:
+            requests = sum(self.counts.values())
+            return {"requests": requests, "routes": dict(self.counts), "reasons": dict(self.reasons),
+                    # compared with answering every routed query in hybrid mode
+                    "graph_pipelines_skipped": self.counts["vector"],
+                    "synthesis_calls_skipped": self.counts["graph"],
+                    "llm_calls_saved": self.llm_calls_saved,
+                    "graph_skip_rate": round(self.counts["vector"] / requests, 4) if requests else 0.0}
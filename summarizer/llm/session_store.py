@@ -0,0 +1,282 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_tokens(text:str):
+    # roughly four characters per token for English text; good enough for budgeting
+    return max(1, len(text) // 4)
+
+
+def new_session():
+    return {"summary": "", "turns": [], "compacting": 0, "updated": time.time()}
+
+
+class MemorySessionBackend:
+    """In-process sessions, evicted least-recently-used first and after `ttl` idle seconds."""
+
+    def __init__(self, max_sessions:int=10000, ttl:float=3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id:str):
+        session = self.sessions.get(session_id)
+        if session is not None and self.ttl and time.time() - session["updated"] > self.ttl:
+            del self.sessions[session_id]
+            self.evictions += 1
+            session = None
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def load(self, session_id:str):
+        with self._lock:
+            session = self.get(session_id)
+            return None if session is None else {"summary": session["summary"], "turns": list(session["turns"])}
+
+    def append(self, session_id:str, turn:dict):
+        """Add a turn; return the session (summary and turns) as it is right after."""
+        with self._lock:
+            session = self.get(session_id) or new_session()
+            session["turns"].append(turn)
+            session["updated"] = time.time()
+            self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evictions += 1
+            return {"summary": session["summary"], "turns": list(session["turns"])}
+
+    def claim_compaction(self, session_id:str, timeout:float):
+        """True for the one caller allowed to summarize the session until replace_turns() or `timeout`."""
+        with self._lock:
+            session = self.get(session_id)
+            if session is None or time.time() - session["compacting"] < timeout:
+                return False
+            session["compacting"] = time.time()
+            return True
+
+    def replace_turns(self, session_id:str, count:int, summary:str):
+        """Replace the first `count` turns with summary (None keeps them) and release the claim."""
+        with self._lock:
+            session = self.get(session_id)
+            if session is None:
+                return
+            if summary is not None:
+                session["summary"] = summary
+                session["turns"] = session["turns"][count:]
+            session["compacting"] = 0
+
+    def delete(self, session_id:str):
+        with self._lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def count(self):
+        return len(self.sessions)
+
+
+class RedisSessionBackend:
+    """Sessions in Redis or any server speaking its protocol (Valkey, KeyDB, ...).
+
+    A session is a hash holding its summary plus a list of JSON turns, appended with
+    RPUSH in a MULTI block, so workers sharing the server never lose a turn. The
+    worker that summarizes old turns claims the session with a `SET NX` marker that
+    expires in case it dies, and swaps in the summary in a WATCH/MULTI transaction.
+    Idle sessions expire through the key TTLs; LRU eviction under memory pressure is
+    left to the server's `maxmemory-policy`. Pass `client` to use an existing client,
+    e.g. `fakeredis.FakeRedis()` as a local stand-in.
+    """
+
+    def __init__(self, url:str="redis://localhost:6379/0", ttl:float=3600, prefix:str="session:", client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("The Redis session backend needs the 'redis' package: pip install redis") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = int(ttl) if ttl else None
+        self.prefix = prefix
+        self.evictions = 0
+
+    def keys(self, session_id:str):
+        key = self.prefix + session_id
+        return key, key + ":turns", key + ":compacting"
+
+    def touch(self, pipe, *keys:str):
+        if self.ttl:
+            for key in keys:
+                pipe.expire(key, self.ttl)
+
+    @staticmethod
+    def session(summary, turns:list):
+        if isinstance(summary, bytes):
+            summary = summary.decode("utf-8")
+        return {"summary": summary or "", "turns": [json.loads(turn) for turn in turns]}
+
+    def load(self, session_id:str):
+        key, turns_key, _ = self.keys(session_id)
+        with self.client.pipeline() as pipe:
+            pipe.exists(key, turns_key)
+            pipe.hget(key, "summary")
+            pipe.lrange(turns_key, 0, -1)
+            self.touch(pipe, key, turns_key)
+            exists, summary, turns = pipe.execute()[:3]
+        return self.session(summary, turns) if exists else None
+
+    def append(self, session_id:str, turn:dict):
+        """Add a turn; return the session (summary and turns) as it is right after."""
+        key, turns_key, _ = self.keys(session_id)
+        with self.client.pipeline() as pipe:
+            pipe.rpush(turns_key, json.dumps(turn))
+            # the hash marks the session as existing even before it has a summary
+            pipe.hsetnx(key, "summary", "")
+            pipe.hget(key, "summary")
+            pipe.lrange(turns_key, 0, -1)
+            self.touch(pipe, key, turns_key)
+            summary, turns = pipe.execute()[2:4]
+        return self.session(summary, turns)
+
+    def claim_compaction(self, session_id:str, timeout:float):
+        """True for the one caller allowed to summarize the session until replace_turns() or `timeout`."""
+        return bool(self.client.set(self.keys(session_id)[2], 1, nx=True, ex=max(1, int(timeout))))
+
+    def replace_turns(self, session_id:str, count:int, summary:str):
+        """Replace the first `count` turns with summary (None keeps them) and release the claim."""
+        key, turns_key, marker = self.keys(session_id)
+
+        def replace(pipe):
+            # a session deleted while being summarized is not brought back
+            exists = pipe.exists(key)
+            pipe.multi()
+            if exists and summary is not None:
+                pipe.hset(key, "summary", summary)
+                pipe.ltrim(turns_key, count, -1)
+            pipe.delete(marker)
+
+        # retried if the session changes between the check and the write
+        self.client.transaction(replace, key)
+
+    def delete(self, session_id:str):
+        return bool(self.client.delete(*self.keys(session_id)))
+
+    def count(self):
+        # counting would scan the whole keyspace on every stats call; the server's INFO keyspace has it
+        return None
+
+
+class SessionStore:
+    """Conversation history per session ID with a bounded token budget.
+
+    Prompts get the session summary plus as many recent turns as fit in
+    `max_history_tokens`. Once the stored turns exceed the budget, the oldest are
+    folded into the summary in the background until the window is back under half
+    the budget, so summarizing never delays an answer.
+    """
+
+    def __init__(self, backend=None, max_history_tokens:int=2000, max_summary_tokens:int=400,
+                 compaction_timeout:float=120):
+        self.backend = backend or MemorySessionBackend()
+        self.max_history_tokens = max_history_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.compaction_timeout = compaction_timeout
+        self.tasks = set()
+        self.summaries = 0
+        self.summary_failures = 0
+
+    @staticmethod
+    def format_turn(turn:dict):
+        return f"query: {turn['query']}\nresponse: {turn['response']}"
+
+    def window(self, session:dict):
+        budget = self.max_history_tokens - estimate_tokens(session["summary"])
+        turns = []
+        for turn in reversed(session["turns"]):
+            budget -= turn["tokens"]
+            if budget < 0:
+                break
+            turns.append(self.format_turn(turn))
+        return list(reversed(turns))
+
+    def load_history(self, session_id:str):
+        session = self.backend.load(session_id)
+        if session is None:
+            return ''
+        parts = [f"summary of earlier conversation: {session['summary']}"] if session["summary"] else []
+        return '\n\n'.join(parts + self.window(session))
+
+    async def history(self, session_id:str):
+        return await asyncio.to_thread(self.load_history, session_id)
+
+    def stale_turns(self, session:dict):
+        """How many of the oldest turns to summarize to get back under half the budget (0 if within budget)."""
+        used = estimate_tokens(session["summary"]) + sum(t["tokens"] for t in session["turns"])
+        if used <= self.max_history_tokens:
+            return 0
+        count = 0
+        while count < len(session["turns"]) - 1 and used > self.max_history_tokens // 2:
+            used -= session["turns"][count]["tokens"]
+            count += 1
+        return count
+
+    def append(self, session_id:str, query:str, response:str):
+        """Add a turn; return the turns to summarize, or None if the window is within budget."""
+        turn = {"query": query, "response": response}
+        turn["tokens"] = estimate_tokens(self.format_turn(turn))
+        session = self.backend.append(session_id, turn)
+        if not self.stale_turns(session) or not self.backend.claim_compaction(session_id, self.compaction_timeout):
+            return None
+        # another worker may have finished a compaction since the append; while this claim is held
+        # only appends happen, so the oldest turns read now are the ones replace_turns() drops
+        session = self.backend.load(session_id)
+        count = self.stale_turns(session) if session is not None else 0
+        if not count:
+            self.backend.replace_turns(session_id, 0, None)
+            return None
+        return session["summary"], session["turns"][:count]
+
+    def replace_turns(self, session_id:str, count:int, summary:str):
+        self.backend.replace_turns(session_id, count, summary)
+
+    def truncate_summary(self, summary:str):
+        limit = self.max_summary_tokens * 4
+        return summary if len(summary) <= limit else summary[-limit:]
+
+    async def compact(self, session_id:str, summary:str, turns:list, summarize=None):
+        text = '\n\n'.join(self.format_turn(turn) for turn in turns)
+        try:
+            if summarize is not None:
+                summary = await summarize(summary, text)
+            else:
+                summary = f"{summary}\n\n{text}".strip()
+            summary = self.truncate_summary(summary.strip())
+            self.summaries += 1
+        except Exception:
+            # keep the turns; the next overflowing turn tries again
+            self.summary_failures += 1
+            summary = None
+        await asyncio.to_thread(self.replace_turns, session_id, len(turns), summary)
+
+    async def record(self, session_id:str, query:str, response, summarize=None):
+        """Store a finished turn; `summarize(summary, turns_text)` is awaited to compress old turns."""
+        if not isinstance(response, str):
+            response = json.dumps(response, default=str)
+        stale = await asyncio.to_thread(self.append, session_id, query, response)
+        if stale is not None:
+            task = asyncio.create_task(self.compact(session_id, *stale, summarize))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    def clear(self, session_id:str):
+        return self.backend.delete(session_id)
+
+    def stats(self):
+        sessions = self.backend.count()
+        return {"sessions": sessions, "evictions": self.backend.evictions,
+                "summaries": self.summaries, "summary_failures": self.summary_failures,
+                "max_history_tokens": self.max_history_tokens}
@@ -0,0 +1,225 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import nullcontext
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+# TRACING_ENABLED=false turns spans into no-ops unless a request asked for its timings
+ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+current_stage = contextvars.ContextVar("current_stage", default="other")
+NO_SPAN = nullcontext()
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Prometheus histogram with a fixed label set, rendered in the text exposition format."""
+
+    def __init__(self, name:str, help:str, labelnames:tuple, buckets:tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value:float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def labels(self, labels:tuple, **extra):
+        pairs = [*zip(self.labelnames, labels), *extra.items()]
+        return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self.series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self.labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{self.labels(labels)} {total}")
+            lines.append(f"{self.name}_count{self.labels(labels)} {count}")
+        return '\n'.join(lines)
+
+
+class Counter:
+
+    def __init__(self, name:str, help:str, labelnames:tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value:float, *labels):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self.values)
+        for labels, value in sorted(values.items()):
+            pairs = ','.join(f'{name}="{escape(label)}"' for name, label in zip(self.labelnames, labels))
+            lines.append(f"{self.name}{{{pairs}}} {value}")
+        return '\n'.join(lines)
+
+
+STAGE_SECONDS = Histogram("fusionqa_stage_seconds", "Duration of query pipeline stages.",
+                          ("stage",), LATENCY_BUCKETS)
+LLM_PROMPT_CHARS = Histogram("fusionqa_llm_prompt_characters", "Prompt size of LLM calls in characters.",
+                             ("stage", "model"), SIZE_BUCKETS)
+LLM_PROMPT_TOKENS = Histogram("fusionqa_llm_prompt_tokens", "Prompt tokens of LLM calls as reported by the provider.",
+                              ("stage", "model"), SIZE_BUCKETS)
+LLM_COMPLETION_TOKENS = Histogram("fusionqa_llm_completion_tokens",
+                                  "Completion tokens of LLM calls as reported by the provider.",
+                                  ("stage", "model"), SIZE_BUCKETS)
+LLM_TOKENS = Counter("fusionqa_llm_tokens_total", "Tokens used by LLM calls.", ("stage", "model", "kind"))
+METRICS = [STAGE_SECONDS, LLM_PROMPT_CHARS, LLM_PROMPT_TOKENS, LLM_COMPLETION_TOKENS, LLM_TOKENS]
+
+
+def render_metrics():
+    return '\n'.join(metric.render() for metric in METRICS) + '\n'
+
+
+class Trace:
+    """Stage durations and LLM calls of one request, for the `timings` block of a response."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.llm_calls = []
+        self._lock = threading.Lock()
+
+    def add(self, stage:str, seconds:float):
+        with self._lock:
+            total, count = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (total + seconds, count + 1)
+
+    def to_dict(self):
+        with self._lock:
+            stages = {stage: {"seconds": round(total, 4), "count": count}
+                      for stage, (total, count) in self.stages.items()}
+            llm_calls = list(self.llm_calls)
+        return {"total": round(time.perf_counter() - self.start, 4), "stages": stages, "llm_calls": llm_calls}
+
+
+def start_trace():
+    """Collect this request's spans; tasks and threads started from here on share the trace."""
+    trace = Trace()
+    current_trace.set(trace)
+    return trace
+
+
+class Span:
+    __slots__ = ("stage", "trace", "start", "token")
+
+    def __init__(self, stage:str, trace:Trace):
+        self.stage = stage
+        self.trace = trace
+
+    def __enter__(self):
+        self.token = current_stage.set(self.stage)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        try:
+            current_stage.reset(self.token)
+        except ValueError:
+            # an async generator closed from another task
+            pass
+        if ENABLED:
+            STAGE_SECONDS.observe(seconds, self.stage)
+        if self.trace is not None:
+            self.trace.add(self.stage, seconds)
+        return False
+
+
+def span(stage:str):
+    """Time a block as a pipeline stage; spans nest, and LLM calls inside are labelled with the innermost stage."""
+    trace = current_trace.get()
+    if trace is None and not ENABLED:
+        return NO_SPAN
+    return Span(stage, trace)
+
+
+def record_llm_call(model:str, prompt_chars:int, prompt_tokens:int=None, completion_tokens:int=None):
+    trace = current_trace.get()
+    if trace is None and not ENABLED:
+        return
+    stage = current_stage.get()
+    model = model or "unknown"
+    if ENABLED:
+        LLM_PROMPT_CHARS.observe(prompt_chars, stage, model)
+        if prompt_tokens is not None:
+            LLM_PROMPT_TOKENS.observe(prompt_tokens, stage, model)
+            LLM_TOKENS.inc(prompt_tokens, stage, model, "prompt")
+        if completion_tokens is not None:
+            LLM_COMPLETION_TOKENS.observe(completion_tokens, stage, model)
+            LLM_TOKENS.inc(completion_tokens, stage, model, "completion")
+    if trace is not None:
+        trace.llm_calls.append({"stage": stage, "model": model, "prompt_characters": prompt_chars,
+                                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+
+
+def payload_chars(payload:dict):
+    return sum(len(str(message.get("content") or '')) for message in payload.get("messages", []))
+
+
+def usage_tokens(usage:dict):
+    usage = usage or {}
+    return usage.get("prompt_tokens", usage.get("input_tokens")), usage.get("completion_tokens", usage.get("output_tokens"))
+
+
+class LlmUsageCallback(BaseCallbackHandler):
+    """Records prompt sizes and token usage of LangChain chat model calls (Cypher generation, QA)."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.prompts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        if current_trace.get() is None and not ENABLED:
+            return
+        params = kwargs.get("invocation_params") or {}
+        self.prompts[run_id] = (sum(len(str(message.content)) for batch in messages for message in batch),
+                                params.get("model_name") or params.get("model"))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt = self.prompts.pop(run_id, None)
+        if prompt is None:
+            return
+        prompt_chars, model = prompt
+        output = response.llm_output or {}
+        usage = output.get("token_usage")
+        if not usage and response.generations and response.generations[0]:
+            usage = getattr(getattr(response.generations[0][0], "message", None), "usage_metadata", None)
+        prompt_tokens, completion_tokens = usage_tokens(usage)
+        record_llm_call(output.get("model_name") or model, prompt_chars, prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.prompts.pop(run_id, None)
+
+
+llm_usage = LlmUsageCallback()
@@ -1,11 +1,14 @@
 from llm.embedding import VectorStore
 from llm.base_llm import LLM
+from llm.session_store import SessionStore
 
 
 class VectorLlm(LLM):
+    stage = "vector_llm"
 
     def __init__(self, model_name:str, GROQ_API_KEY:str, vector_store:VectorStore,
-                 system_role_prompt:str=None, history_tracking=False):
+                 system_role_prompt:str=None, history_tracking=False,
+                 sessions:SessionStore=None):
         self.system_role_prompt = system_role_prompt
 #         system_prompt = """You are a banking expert with knowledge about regulatory compliances about different entities.
 # Answer user questions clearly, concisely, and professionally explaining in simple terms assuming the user does not have a vivid knowledge of BFSI domain.
@@ -17,4 +20,16 @@ Answer user questions clearly, concisely, and professionally explaining in simpl
 Do not exaggerate or fabricate any information. If the context does not provide sufficient information to answer a question, respond with
 "I don't have enough information to answer that.". You may answer unrelated questions only if you are confident in your response.
 """
-        super().__init__(model_name, GROQ_API_KEY, system_prompt, vector_store, history_tracking)
\ No newline at end of file
+        super().__init__(model_name, GROQ_API_KEY, system_prompt, vector_store, history_tracking,
+                         sessions=sessions)
+
+    async def stream_events(self, query:str, session_id:str=None, retrieval:dict=None, context:str=None):
+        """Yield (event, data) pairs: retrieval, answer tokens and the final response."""
+        if context is None:
+            context = await self.retrieve_context(query, retrieval)
+        yield "retrieval", {"characters": len(context)}
+        tokens = []
+        async for token in self.stream_llm(query, context, session_id):
+            tokens.append(token)
+            yield "token", token
+        yield "done", ''.join(tokens).strip()
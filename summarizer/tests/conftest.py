@@ -0,0 +1,59 @@
+import hashlib
+import os
+import sys
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+# the modules import each other from the summarizer folder, as when the API runs from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class HashEmbeddings(Embeddings):
+    """Normalized bag-of-words vectors: texts sharing words are close, without loading a model."""
+
+    dim = 256
+
+    def embed_query(self, text:str):
+        vector = np.zeros(self.dim, dtype="float32")
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        return (vector / max(np.linalg.norm(vector), 1e-6)).tolist()
+
+    def embed_documents(self, texts:list):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_queries(self, texts:list):
+        return self.embed_documents(texts)
+
+
+@pytest.fixture(scope="session")
+def embeddings():
+    return HashEmbeddings()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """An empty working directory with a documents folder; modules resolve ./documents, ./vector_db from it."""
+    (tmp_path / "documents").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def make_document(folder, name:str, keyword:str, pages:int=2):
+    from benchmarks.corpus import make_pdf
+    # the keyword dominates every page, so a search for it finds this document
+    text = ' '.join([keyword] * 40 + ["the bank reported its capital position to the regulator"] * 3)
+    path = os.path.join(folder, "documents", f"{name}.pdf")
+    make_pdf(path, [text] * pages)
+    return path
+
+
+@pytest.fixture(scope="session")
+def document_maker():
+    return make_document
+
+
+@pytest.fixture
+def write_pdf(workspace):
+    return lambda name, keyword, pages=2: make_document(str(workspace), name, keyword, pages)
@@ -0,0 +1,90 @@
+import os
+import time
+import pytest
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory, embeddings, document_maker):
+    """The API started lazily from a folder with a small vector DB, with Neo4j unreachable."""
+    folder = tmp_path_factory.mktemp("api")
+    os.makedirs(folder / "documents")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(folder)
+        for name, value in {"GROQ_API_KEY": "test", "NEO4J_URI": "bolt://127.0.0.1:1", "NEO4J_USERNAME": "neo4j",
+                            "NEO4J_PASSWORD": "test", "STARTUP_MODE": "lazy"}.items():
+            patch.setenv(name, value)
+        from llm.embedding import VectorStore
+        document_maker(str(folder), "alpha", "zebracorn")
+        builder = VectorStore(embeddings=embeddings)
+        builder.sync_documents()
+        builder.close()
+
+        import app
+        patch.setattr(app.vs, "embeddings", embeddings)
+        patch.setattr(app.response_cache, "embeddings", embeddings)
+        load = app.vs.load
+
+        def slow_load():
+            # queries sent right after startup arrive while the store is still loading
+            time.sleep(0.5)
+            load()
+        patch.setattr(app.vs, "load", slow_load)
+
+        async def complete(api_key, payload):
+            # echoes the prompt, so responses show the retrieved context
+            return payload["messages"][0]["content"]
+        patch.setattr(app.chat_client, "complete", complete)
+
+        async def stream(api_key, payload):
+            for word in payload["messages"][0]["content"].split():
+                yield word + " "
+        patch.setattr(app.chat_client, "stream", stream)
+        yield app
+
+
+@pytest.fixture(scope="module")
+def client(app_module):
+    from fastapi.testclient import TestClient
+    with TestClient(app_module.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("fields, steps", [
+    ({}, ("vector_store", "embedding_model", "vector_llm")),
+    ({"use_graph": True}, ("vector_store", "embedding_model", "vector_llm", "graph")),
+    ({"use_vector": False, "use_graph": True}, ("graph",)),
+    ({"auto_route": True}, ("vector_store", "embedding_model", "vector_llm", "graph")),
+])
+def test_warmup_steps(app_module, fields, steps):
+    request = app_module.QueryRequest(query="q", **fields)
+    assert app_module.warmup_steps(request) == steps
+
+
+def test_auto_routed_queries_wait_for_a_lazy_startup(client):
+    # the first request of the module, sent while the vector store is loading
+    response = client.post("/query", json={"query": "zebracorn", "auto_route": True, "use_cache": False})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["route"]["reason"] == "graph_unavailable"
+    assert "zebracorn" in body["response"]
+
+
+def test_vector_queries_are_answered_without_neo4j(client):
+    response = client.post("/query", json={"query": "zebracorn"})
+    assert response.status_code == 200 and "zebracorn" in response.json()["response"]
+    stream = client.post("/query/stream", json={"query": "zebracorn", "use_cache": False})
+    assert "event: done" in stream.text and "zebracorn" in stream.text
+
+
+@pytest.mark.parametrize("fields", [{"use_graph": True}, {"use_vector": False, "use_graph": True}])
+def test_graph_queries_get_503_while_neo4j_is_down(client, fields):
+    response = client.post("/query", json={"query": "zebracorn", **fields})
+    assert response.status_code == 503
+    assert "graph" in response.json()["detail"]
+    assert client.post("/query/stream", json={"query": "zebracorn", **fields}).status_code == 503
+
+
+def test_readiness_leaves_out_the_graph_unless_asked(client):
+    ready = client.get("/ready")
+    assert ready.status_code == 200 and ready.json()["steps"]["graph"] == "error"
+    assert client.get("/ready", params={"graph": True}).status_code == 503
@@ -0,0 +1,28 @@
+from graph.entity_matcher import EntityMatcher
+
+
+NAMES = ["Bank of England", "England", "Barclays", "Financial Conduct Authority", "Basel III"]
+
+
+def test_exact_match_is_case_and_punctuation_insensitive():
+    matcher = EntityMatcher(NAMES)
+    assert matcher.match("What did the bank of england board decide?") == ["Bank of England", "England"]
+    assert matcher.match("Is basel-iii in force?") == []
+    assert matcher.match("Is Basel III in force?") == ["Basel III"]
+
+
+def test_overlapping_names_are_all_found():
+    matcher = EntityMatcher(NAMES)
+    assert set(matcher.match("Barclays and the Financial Conduct Authority")) == \
+        {"Barclays", "Financial Conduct Authority"}
+
+
+def test_fuzzy_matching_is_opt_in():
+    assert EntityMatcher(NAMES).match("fines for Barclys") == []
+    assert EntityMatcher(NAMES, fuzzy=True).match("fines for Barclys") == ["Barclays"]
+
+
+def test_fuzzy_matching_skips_common_tokens():
+    names = [f"Bank {i}" for i in range(10)]
+    matcher = EntityMatcher(names, fuzzy=True, max_token_names=5)
+    assert matcher.match("which bank 3x") == []
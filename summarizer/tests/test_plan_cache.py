@@ -0,0 +1,33 @@
+from graph.plan_cache import CypherPlanCache
+
+
+def test_entity_literals_become_parameters():
+    plan = CypherPlanCache.parameterize(
+        "MATCH (b {id: 'Barclays'})-[:FINED_BY]->(r {id: \"FCA\"}) RETURN r", ["Barclays", "FCA"])
+    assert plan.cypher == "MATCH (b {id: $e0})-[:FINED_BY]->(r {id: $e1}) RETURN r"
+    assert plan.params(["HSBC", "PRA"]) == {"e0": "HSBC", "e1": "PRA"}
+
+
+def test_casing_of_the_literal_is_replayed():
+    plan = CypherPlanCache.parameterize("MATCH (b) WHERE toLower(b.id) = 'barclays' RETURN b", ["Barclays"])
+    assert plan.params(["HSBC"]) == {"e0": "hsbc"}
+
+
+def test_other_literals_are_kept():
+    plan = CypherPlanCache.parameterize("MATCH (b {id: 'Barclays'})-[r {year: '2023'}]->() RETURN r", ["Barclays"])
+    assert "'2023'" in plan.cypher
+
+
+def test_entities_not_referenced_as_literals_are_not_templated():
+    assert CypherPlanCache.parameterize("MATCH (b) WHERE b.id CONTAINS 'Barc' RETURN b", ["Barclays"]) is None
+
+
+def test_same_question_about_another_entity_hits_the_plan():
+    cache = CypherPlanCache()
+    key, names = cache.shape("Who fined Barclays?", {"Barclays": ["Bank"]})
+    cache.put(key, "MATCH (b {id: 'Barclays'})<-[:FINED]-(r) RETURN r", names)
+    other_key, other_names = cache.shape("who fined HSBC", {"HSBC": ["Bank"]})
+    assert other_key == key
+    assert cache.get(other_key).params(other_names) == {"e0": "HSBC"}
+    # an entity with other labels gets its own plan
+    assert cache.shape("Who fined Basel?", {"Basel": ["Regulation"]})[0] != key
@@ -0,0 +1,60 @@
+import numpy as np
+from llm.response_cache import ResponseCache
+
+
+class SameEmbeddings:
+    """Every query embeds alike, as near-identical questions about different entities do."""
+
+    def embed_query(self, text:str):
+        return np.ones(8, dtype="float32")
+
+
+def test_exact_hit_ignores_case_and_spacing():
+    cache = ResponseCache(SameEmbeddings())
+    cache.put("vector", "What is the  capital ratio?", "12%")
+    assert cache.get("vector", "what is the capital ratio?")[0] == "12%"
+    assert cache.stats()["hits_exact"] == 1
+
+
+def test_semantic_tier_is_opt_in():
+    cache = ResponseCache(SameEmbeddings())
+    cache.put("vector", "What is the capital ratio?", "12%")
+    assert cache.get("vector", "Which capital ratio applies?") == (None, None)
+
+
+def test_semantic_hit_needs_the_same_entities():
+    cache = ResponseCache(SameEmbeddings(), semantic=True)
+    response, vector = cache.get("vector", "What was the revenue of Bank X in 2023?")
+    cache.put("vector", "What was the revenue of Bank X in 2023?", "10bn", vector)
+    assert cache.get("vector", "what was revenue of Bank X in 2023")[0] == "10bn"
+    assert cache.get("vector", "What was the revenue of Bank Y in 2023?")[0] is None
+    assert cache.get("vector", "What was the revenue of Bank X in 2022?")[0] is None
+
+
+def test_semantic_hit_needs_the_same_graph_entities():
+    cache = ResponseCache(SameEmbeddings(), semantic=True)
+    response, vector = cache.get("graph", "who regulates acme", entities=["acme"])
+    cache.put("graph", "who regulates acme", "the FCA", vector, entities=["acme"])
+    assert cache.get("graph", "who is regulating acme", entities=["Acme"])[0] == "the FCA"
+    assert cache.get("graph", "who regulates globex", entities=["globex"])[0] is None
+
+
+def test_namespaces_are_apart():
+    cache = ResponseCache(SameEmbeddings(), semantic=True)
+    cache.put("vector", "What is the capital ratio?", "12%", cache.get("vector", "What is the capital ratio?")[1])
+    assert cache.get("hybrid", "What is the capital ratio?")[0] is None
+
+
+def test_put_after_invalidation_is_dropped():
+    cache = ResponseCache(SameEmbeddings())
+    generation = cache.invalidations
+    cache.clear()
+    cache.put("vector", "What is the capital ratio?", "12%", generation=generation)
+    assert cache.get("vector", "What is the capital ratio?")[0] is None
+
+
+def test_expired_entries_miss():
+    cache = ResponseCache(SameEmbeddings(), ttl=1)
+    cache.put("vector", "What is the capital ratio?", "12%")
+    cache.entries[("vector", "what is the capital ratio?")]["created"] -= 2
+    assert cache.get("vector", "What is the capital ratio?")[0] is None
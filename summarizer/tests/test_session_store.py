@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import pytest
+from llm.session_store import MemorySessionBackend, RedisSessionBackend, SessionStore
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend_factory(request):
+    """Makes backends sharing one store, like the workers of one deployment."""
+    if request.param == "memory":
+        backend = MemorySessionBackend()
+        return lambda: backend
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return lambda: RedisSessionBackend(client=fakeredis.FakeRedis(server=server))
+
+
+def test_history_keeps_the_recent_turns_within_budget(backend_factory):
+    store = SessionStore(backend_factory(), max_history_tokens=60)
+    for i in range(3):
+        store.append("s", f"question {i}", "answer " * 20)
+    history = store.load_history("s")
+    assert "question 2" in history and "question 0" not in history
+
+
+def test_unknown_session_has_no_history(backend_factory):
+    assert SessionStore(backend_factory()).load_history("missing") == ''
+
+
+def test_append_returns_the_oldest_turns_once_over_budget(backend_factory):
+    store = SessionStore(backend_factory(), max_history_tokens=40)
+    assert store.append("s", "first", "short") is None
+    summary, turns = store.append("s", "second", "answer " * 20)
+    assert summary == '' and [turn["query"] for turn in turns] == ["first"]
+    # the session stays claimed until replace_turns()
+    assert store.append("s", "third", "answer " * 20) is None
+    store.replace_turns("s", len(turns), "talked about first")
+    assert store.load_history("s").startswith("summary of earlier conversation: talked about first")
+    assert store.append("s", "fourth", "answer " * 20) is not None
+
+
+def test_failed_summary_keeps_the_turns(backend_factory):
+    store = SessionStore(backend_factory(), max_history_tokens=40)
+    store.append("s", "first", "short")
+    summary, turns = store.append("s", "second", "answer " * 20)
+    store.replace_turns("s", len(turns), None)
+    assert [turn["query"] for turn in store.backend.load("s")["turns"]] == ["first", "second"]
+    # and the session can be claimed again
+    assert store.append("s", "third", "answer " * 20) is not None
+
+
+def test_concurrent_workers_lose_no_turns(backend_factory):
+    workers = [SessionStore(backend_factory(), max_history_tokens=10 ** 9) for _ in range(4)]
+
+    def append(worker, w):
+        for i in range(25):
+            worker.append("s", f"q{w}-{i}", "r")
+
+    threads = [threading.Thread(target=append, args=(worker, w)) for w, worker in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(workers[0].backend.load("s")["turns"]) == 100
+
+
+def test_only_one_worker_compacts_a_session(backend_factory):
+    workers = [SessionStore(backend_factory(), max_history_tokens=40) for _ in range(4)]
+    workers[0].append("s", "first", "short")
+    stale = [worker.append("s", "next", "answer " * 20) for worker in workers]
+    assert sum(turns is not None for turns in stale) == 1
+
+
+def test_record_summarizes_in_the_background(backend_factory):
+    store = SessionStore(backend_factory(), max_history_tokens=40)
+
+    async def summarize(summary, text):
+        return "summary of " + str(text.count("query:")) + " turns"
+
+    async def main():
+        for i in range(4):
+            await store.record("s", f"question {i}", "answer " * 10, summarize)
+        await asyncio.gather(*store.tasks)
+
+    asyncio.run(main())
+    assert "summary of" in store.load_history("s")
+    assert store.stats()["summaries"] >= 1
+
+
+def test_clear_forgets_the_session(backend_factory):
+    store = SessionStore(backend_factory())
+    store.append("s", "first", "short")
+    assert store.clear("s")
+    assert not store.clear("s")
+    assert store.load_history("s") == ''
@@ -0,0 +1,93 @@
+import os
+import pytest
+
+
+@pytest.fixture(params=("flat", "ivf_flat", "ivf_pq", "hnsw"))
+def store(request, workspace, embeddings):
+    # data_processing.loader lists ./documents on import, so modules are imported from the workspace
+    from llm.embedding import VectorStore
+    vs = VectorStore(index_type=request.param, nlist=2, nprobe=2, pq_m=8, pq_nbits=2, embeddings=embeddings)
+    yield vs
+    vs.close()
+
+
+def search(vs, keyword:str):
+    return '\n'.join(vs.similarity_search(keyword, k=2, fetch_k=4))
+
+
+def test_sync_builds_the_store(store, write_pdf):
+    write_pdf("alpha", "zebracorn")
+    write_pdf("beta", "quokkafin")
+    changes = store.sync_documents()
+    assert sorted(changes["added"]) == ["alpha", "beta"]
+    assert sorted(store.manifest["files"]) == ["alpha", "beta"]
+    assert "zebracorn" in search(store, "zebracorn")
+    assert not os.path.exists(f"{store.db_folder}.building")
+
+
+def test_sync_without_changes_keeps_the_store(store, write_pdf):
+    write_pdf("alpha", "zebracorn")
+    store.sync_documents()
+    serving = store.vector_store
+    assert store.sync_documents() == {"added": [], "updated": [], "removed": []}
+    assert store.vector_store is serving
+
+
+def test_add_and_remove_document(store, write_pdf):
+    write_pdf("alpha", "zebracorn")
+    store.sync_documents()
+    path = write_pdf("gamma", "narwhalite")
+    assert store.add_document(path)["added"] == ["gamma"]
+    assert "narwhalite" in search(store, "narwhalite")
+
+    store.remove_document("gamma.pdf")
+    assert "gamma" not in store.manifest["files"]
+    assert "narwhalite" not in search(store, "narwhalite")
+    with pytest.raises(ValueError):
+        store.remove_document("gamma.pdf")
+
+
+def test_sync_applies_updates_and_deletions(store, write_pdf, workspace):
+    write_pdf("alpha", "zebracorn")
+    write_pdf("beta", "quokkafin")
+    store.sync_documents()
+    write_pdf("alpha", "axolotlium")
+    os.remove(workspace / "documents" / "beta.pdf")
+    changes = store.sync_documents()
+    assert changes == {"added": [], "updated": ["alpha"], "removed": ["beta"]}
+    found = search(store, "axolotlium")
+    assert "axolotlium" in found and "quokkafin" not in found
+
+
+def test_searches_running_during_a_sync_see_the_old_generation(store, write_pdf):
+    write_pdf("alpha", "zebracorn")
+    store.sync_documents()
+    with store.reading() as (served, _):
+        write_pdf("beta", "quokkafin")
+        store.sync_documents()
+        # the generation read before the swap is untouched
+        assert served is not store.vector_store
+        assert served.index.ntotal < store.vector_store.index.ntotal
+    assert "quokkafin" in search(store, "quokkafin")
+
+
+def test_a_second_process_reloads_the_swapped_store(store, write_pdf, embeddings):
+    write_pdf("alpha", "zebracorn")
+    store.sync_documents()
+    other = type(store)(index_type=store.index_type, embeddings=embeddings)
+    other.load()
+    try:
+        assert not other.using_sample_vector
+        assert "zebracorn" in search(other, "zebracorn")
+    finally:
+        other.close()
+
+
+def test_chunking_change_rebuilds_from_scratch(store, write_pdf):
+    write_pdf("alpha", "zebracorn")
+    store.sync_documents()
+    changes = store.sync_documents(page_wise=True)
+    assert changes["added"] == ["alpha"]
+    assert store.manifest["page_wise"] is True
+    # without an explicit chunking the stored one is kept
+    assert store.sync_documents() == {"added": [], "updated": [], "removed": []}
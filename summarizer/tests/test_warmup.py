@@ -0,0 +1,41 @@
+import asyncio
+from jobs.warmup import Warmup
+
+
+def flaky(failures:int):
+    calls = []
+
+    def step():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ConnectionError("not yet")
+    return step, calls
+
+
+def test_failed_steps_are_retried_until_they_succeed():
+    step, calls = flaky(2)
+
+    async def main():
+        warmup = Warmup([("ok", lambda: None), ("flaky", step)], retry_delay=0.01)
+        await warmup.start()
+        return warmup
+
+    warmup = asyncio.run(main())
+    assert warmup.ready and len(calls) == 3
+    assert warmup.status()["attempts"] == {"ok": 1, "flaky": 3}
+
+
+def test_wait_only_covers_the_first_attempt_of_the_named_steps():
+    step, _ = flaky(100)
+
+    async def main():
+        warmup = Warmup([("vector", lambda: None), ("graph", step)], retry_delay=10)
+        warmup.start()
+        await asyncio.wait_for(warmup.wait("vector", "graph"), 1)
+        status = warmup.status(("vector",)), warmup.status()
+        warmup.cancel()
+        return status
+
+    vector, everything = asyncio.run(main())
+    assert vector["status"] == "ready"
+    assert everything["status"] == "error" and "ConnectionError" in everything["errors"]["graph"]